@@ -1,4 +1,6 @@
+import asyncio
 import json
+import time
 import uuid
 from typing import Optional
 from fastapi import Depends, status, APIRouter, BackgroundTasks, Query
@@ -17,7 +19,8 @@ from app.utils.bilibili import (
     get_user_comments,
     analyze_user_profiles,
 )
-from app.schemas.api import CookieData, ChatRequest
+from app.utils.bilibili.cookie_pool import CookiePool, CookiePoolExhausted, KIND_BILIBILI, KIND_AICU
+from app.schemas.api import CookieData, ChatRequest, BulkUidRequest
 from app.utils.agent.openai_client import OpenaiClient
 from app.schemas.user import User
 import app.utils.bilibili.analyze_video_comments as comment_analysis
@@ -29,12 +32,25 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 global_redis = RedisClient()
 
+# 批量 UID 任务：单次最多提交的 UID 数、同时抓取的 UID 数、每攒多少个 UID 写一次数据库
+BULK_UID_MAX = 1000
+BULK_UID_CONCURRENCY = 8
+BULK_UID_WRITE_BATCH = 20
+# 批量任务进度写入 Redis 的最小间隔（秒），避免每完成一个 UID 就序列化一次全部状态
+BULK_STATUS_INTERVAL = 1.0
+# 批量推荐单次最多提交的 UID 数
+TUIJIAN_BATCH_MAX = 10000
+
 
 @router.get("/select/{BV}")
-async def select_BV(BV: str, current_user: User = Depends(get_current_user)):
+async def select_BV(
+    BV: str,
+    refresh: bool = Query(False, description="强制增量同步最新评论"),
+    current_user: User = Depends(get_current_user),
+):
     try:
         logger.info(f"Select BV request by user {current_user.username} for BV: {BV}")
-        result = await get_video_comments.select_by_BV(BV)
+        result = await get_video_comments.select_by_BV(BV, refresh=refresh)
         global_redis.redis_value_add("leiji")
         if result:
             comment_texts = [
@@ -63,6 +79,9 @@ async def select_BV(BV: str, current_user: User = Depends(get_current_user)):
         else:
             logger.warning(f"No data found for BV: {BV}")
             return create_error_response(404, "Not Found")
+    except CookiePoolExhausted as e:
+        logger.warning(str(e))
+        return create_error_response(503, str(e))
     except Exception as e:
         logger.error(f"Error retrieving BV {BV}: {e}")
         log_error(e, "select_BV")
@@ -121,8 +140,182 @@ async def get_uids(current_user: User = Depends(get_current_user)):
 
 @router.post("/change_cookie_user")
 async def change_user_cookie(data: CookieData):
+    """
+    设置B站 cookie：写入旧的单 cookie key，并加入 bilibili cookie 池（池不为空时只从池中取账号）
+    """
     global_redis.redis_set_by_key("cookie", data.cookie)
-    return {"code": 200, "message": "修改成功"}
+    cookie_id = await CookiePool(KIND_BILIBILI).add(data.cookie)
+    return {"code": 200, "message": "修改成功", "data": {"cookie_id": cookie_id}}
+
+
+# --- Cookie 池管理 ---
+@router.post("/cookie_pool/{kind}")
+async def add_pool_cookie(
+    kind: str, data: CookieData, current_user: User = Depends(get_current_user)
+):
+    """
+    向 cookie 池添加一个账号，kind 为 bilibili 或 aicu
+    """
+    if kind not in (KIND_BILIBILI, KIND_AICU):
+        return create_error_response(400, f"未知的 cookie 池类型: {kind}")
+    cookie_id = await CookiePool(kind).add(data.cookie)
+    logger.info(f"用户 {current_user.username} 向 {kind} cookie 池添加了 {cookie_id}")
+    return JSONResponse(
+        status_code=200,
+        content={"code": 200, "message": "添加成功", "data": {"cookie_id": cookie_id}},
+    )
+
+
+@router.get("/cookie_pool/{kind}")
+async def get_pool_status(kind: str, current_user: User = Depends(get_current_user)):
+    """
+    查看 cookie 池中各账号的健康分和剩余冷却时间
+    """
+    if kind not in (KIND_BILIBILI, KIND_AICU):
+        return create_error_response(400, f"未知的 cookie 池类型: {kind}")
+    return JSONResponse(
+        status_code=200,
+        content={"code": 200, "message": "success", "data": await CookiePool(kind).status()},
+    )
+
+
+@router.delete("/cookie_pool/{kind}/{cookie_id}")
+async def remove_pool_cookie(
+    kind: str, cookie_id: str, current_user: User = Depends(get_current_user)
+):
+    if kind not in (KIND_BILIBILI, KIND_AICU):
+        return create_error_response(400, f"未知的 cookie 池类型: {kind}")
+    if not await CookiePool(kind).remove(cookie_id):
+        return create_error_response(404, "cookie 不存在")
+    return {"code": 200, "message": "删除成功"}
+
+
+# --- Background Task for Bulk UID Comment Fetching ---
+async def run_bulk_user_comments_task(uids: list[str], job_id: str, username: str):
+    """
+    并发抓取多个 UID 的评论（共用 aicu 限流桶），攒批写入 MySQL，并在任务状态里记录每个 UID 的进度
+    """
+    redis_handler = global_redis
+    semaphore = asyncio.Semaphore(BULK_UID_CONCURRENCY)
+    uid_status: dict[str, dict] = {uid: {"status": "Pending"} for uid in uids}
+    pending: dict[str, list] = {}
+    finished = 0
+    write_lock = asyncio.Lock()
+    last_report = 0.0
+
+    def report(status_name: str = "Processing", details: str | None = None, force: bool = True):
+        nonlocal last_report
+        now = time.monotonic()
+        if not force and now - last_report < BULK_STATUS_INTERVAL:
+            return
+        last_report = now
+        redis_handler.set_job_status(job_id, {
+            "status": status_name,
+            "progress": int(finished / len(uids) * 100),
+            "details": details or f"已完成 {finished}/{len(uids)} 个UID",
+            "uids": uid_status,
+        })
+
+    async def flush():
+        if not pending:
+            return
+        batch = dict(pending)
+        pending.clear()
+        success = await asyncio.to_thread(database.save_user_comments_batch, username, batch)
+        for uid, comments in batch.items():
+            uid_status[uid] = {"status": "Saved" if success else "SaveFailed", "comment_count": len(comments)}
+        # 与单个 UID 的接口一样记录查询历史
+        try:
+            await asyncio.to_thread(database.add_uuid_history_batch, username, {
+                uid: f"获取到 {len(comments)} 条评论" for uid, comments in batch.items()
+            }, job_id)
+        except Exception as e:
+            logger.error(f"Failed to add UID history: {e}")
+
+    async def fetch_one(uid: str):
+        nonlocal finished
+        async with semaphore:
+            uid_status[uid] = {"status": "Fetching"}
+            try:
+                comments = await get_user_comments.get_user_comments_async(uid)
+            except Exception as e:
+                logger.error(f"批量任务 {job_id} 获取UID {uid} 评论失败: {e}")
+                comments = None
+        async with write_lock:
+            finished += 1
+            if comments is None:
+                uid_status[uid] = {"status": "Failed"}
+            elif not comments:
+                uid_status[uid] = {"status": "Empty", "comment_count": 0}
+            else:
+                uid_status[uid] = {"status": "Fetched", "comment_count": len(comments)}
+                pending[uid] = comments
+                if len(pending) >= BULK_UID_WRITE_BATCH:
+                    await flush()
+            report(force=False)
+
+    try:
+        report(details=f"开始获取 {len(uids)} 个UID的评论...")
+        await asyncio.gather(*(fetch_one(uid) for uid in uids))
+        async with write_lock:
+            await flush()
+        saved = sum(1 for item in uid_status.values() if item["status"] == "Saved")
+        report("Completed", f"批量获取完成: {saved}/{len(uids)} 个UID已保存")
+        logger.info(f"Bulk UID job {job_id} completed: {saved}/{len(uids)} saved")
+    except Exception as e:
+        error_message = f"批量获取评论任务失败: {e}"
+        logger.error(error_message)
+        log_error(e, "run_bulk_user_comments_task")
+        report("Failed", error_message)
+
+
+# 必须声明在 /user/comments/{uid} 之前，否则 "bulk" 会被当成 uid 匹配
+@router.post("/user/comments/bulk")
+async def submit_bulk_user_comments(
+    data: BulkUidRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    批量提交 UID，后台并发获取评论并分批写入数据库
+    """
+    global_redis.redis_value_add("leiji")
+    uids = list(dict.fromkeys(uid.strip() for uid in data.uids if uid.strip()))
+    if not uids:
+        return create_error_response(400, "UID 列表为空")
+    if len(uids) > BULK_UID_MAX:
+        return create_error_response(400, f"单次最多提交 {BULK_UID_MAX} 个UID")
+    invalid = [uid for uid in uids if not uid.isdigit()]
+    if invalid:
+        # user_comments.uid 为整数列，一个非法 UID 会让整批写入失败
+        return create_error_response(400, f"UID 必须为数字: {', '.join(invalid[:10])}")
+
+    job_id = f"bulk_uid_{uuid.uuid4().hex[:8]}"
+    background_tasks.add_task(run_bulk_user_comments_task, uids, job_id, current_user.username)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "code": 202,
+            "message": "批量任务已提交，将在后台进行处理。",
+            "data": {"job_id": job_id, "uid_count": len(uids)},
+        },
+    )
+
+
+@router.get("/user/comments/bulk/{job_id}")
+async def get_bulk_user_comments_status(
+    job_id: str, current_user: User = Depends(get_current_user)
+):
+    """
+    查询批量任务进度，包含每个 UID 的状态
+    """
+    job_status = global_redis.get_job_status(job_id)
+    if job_status is None:
+        return create_error_response(404, "未找到该批量任务")
+    return JSONResponse(
+        status_code=200,
+        content={"code": 200, "message": "success", "data": job_status},
+    )
 
 
 @router.post("/user/comments/{uid}")
@@ -137,16 +330,16 @@ async def get_user_comments_resp(
     try:
         logger.info(f"用户 {current_user.username} 请求获取用户 {uid} 的评论")
 
-        # 直接调用评论获取函数
-        comments = get_user_comments.get_user_comments_simple(uid)
+        # 异步分页获取，不阻塞事件循环
+        comments = await get_user_comments.get_user_comments_async(uid)
 
         if comments:
             logger.info(f"成功获取 {len(comments)} 条评论，准备保存到数据库")
             # 保存到数据库
-            success = database.save_user_comments(uid, current_user.username, comments)
+            success = await asyncio.to_thread(database.save_user_comments, uid, current_user.username, comments)
             # Restore UID history saving
             try:
-                database.add_uuid_history(uid, current_user.username, "none", f"获取到 {len(comments)} 条评论")
+                await asyncio.to_thread(database.add_uuid_history, uid, current_user.username, "none", f"获取到 {len(comments)} 条评论")
             except Exception as e:
                 logger.error(f"Failed to add UID history: {e}")
             
@@ -173,6 +366,9 @@ async def get_user_comments_resp(
                 404, "未找到该用户的评论数据，可能是API访问限制或用户无评论"
             )
 
+    except CookiePoolExhausted as e:
+        logger.warning(str(e))
+        return create_error_response(503, str(e))
     except Exception as e:
         logger.error(f"获取用户评论失败: {e}")
         log_error(e, "get_user_comments")
@@ -189,7 +385,7 @@ async def get_saved_user_comments(
     """
     try:
         # 首先尝试从数据库获取
-        comments = database.get_user_comments(uid)
+        comments = await asyncio.to_thread(database.get_user_comments, uid)
 
         if comments:
             return JSONResponse(
@@ -199,11 +395,11 @@ async def get_saved_user_comments(
 
         # 数据库中没有，尝试从B站实时获取
         logger.info(f"数据库中未找到用户 {uid} 的评论，尝试实时获取")
-        comments = get_user_comments.get_user_comments_simple(uid)
+        comments = await get_user_comments.get_user_comments_async(uid)
 
         if comments and len(comments) > 0:
             # 保存到数据库
-            success = database.save_user_comments(uid, current_user.username, comments)
+            success = await asyncio.to_thread(database.save_user_comments, uid, current_user.username, comments)
             if success:
                 logger.info(f"成功获取并保存用户 {uid} 的 {len(comments)} 条评论")
             return JSONResponse(
@@ -225,6 +421,9 @@ async def get_saved_user_comments(
                 },
             )
 
+    except CookiePoolExhausted as e:
+        logger.warning(str(e))
+        return create_error_response(503, str(e))
     except Exception as e:
         logger.error(f"获取用户 {uid} 评论失败: {e}")
         return JSONResponse(
@@ -364,24 +563,21 @@ async def run_comment_analysis_task(bv_id: str, job_id: str, username: str):
         }
         redis_handler.set_job_status(job_id, status_update)
 
-        comments = await get_video_comments.select_by_BV(bv_id)
-        if not comments:
-            raise ValueError(
-                f"未找到视频 {bv_id} 的评论数据，请检查BV号是否正确或稍后再试。"
-            )
+        # 2. Crawl and analyze as a stream; partial results are exposed in the job status
+        async def report_partial(partial: dict):
+            processed = partial.get("cleaning_report", {}).get("raw_total", 0)
+            redis_handler.set_job_status(job_id, {
+                "status": "Processing",
+                "progress": min(20 + partial.get("pages_processed", 0) * 10, 90),
+                "details": f"已处理 {processed} 条评论，正在进行智能分析...",
+                "partial_result": partial,
+            })
 
-        # 2. Update status: Analyzing comments
-        status_update = {
-            "status": "Processing",
-            "progress": 60,
-            "details": f"已获取 {len(comments)} 条评论，正在进行智能分析...",
-        }
-        redis_handler.set_job_status(job_id, status_update)
-
-        analysis_result = await comment_analysis.analyze_bv_comments(bv_id, comments)
+        analysis_result = await comment_analysis.analyze_comments_streaming(bv_id, report_partial)
 
         if "error" in analysis_result:
             raise Exception(analysis_result["error"])
+        comment_count = analysis_result.get("cleaning_report", {}).get("raw_total", 0)
 
         # 3. Update status: Completed
         status_update = {
@@ -395,10 +591,10 @@ async def run_comment_analysis_task(bv_id: str, job_id: str, username: str):
 
         # 4. Save to history
         try:
-            summary = f"智能分析完成: 处理了 {len(comments)} 条评论"
+            summary = f"智能分析完成: 处理了 {comment_count} 条评论"
             if "basic_stats" in analysis_result:
                 stats = analysis_result["basic_stats"]
-                total = stats.get("total_comments", len(comments))
+                total = stats.get("total_comments", comment_count)
                 sentiment = analysis_result.get("sentiment_analysis", {})
                 pos = sentiment.get("positive", 0)
                 neg = sentiment.get("negative", 0)
@@ -543,6 +739,52 @@ async def video_by_user(uid: str, current_user: User = Depends(get_current_user)
         )
 
 
+@router.post("/tuijian/batch")
+async def submit_tuijian_batch(
+    data: BulkUidRequest, current_user: User = Depends(get_current_user)
+):
+    """
+    批量生成推荐：由向量 Worker 一次性读取画像、合并编码、分块检索，结果写回各用户的 {uid}_videos
+    """
+    global_redis.redis_value_add("chuli")
+    uids = list(dict.fromkeys(uid.strip() for uid in data.uids if uid.strip()))
+    if not uids:
+        return create_error_response(400, "UID 列表为空")
+    if len(uids) > TUIJIAN_BATCH_MAX:
+        return create_error_response(400, f"单次最多提交 {TUIJIAN_BATCH_MAX} 个UID")
+    invalid = [uid for uid in uids if not uid.isdigit()]
+    if invalid:
+        return create_error_response(400, f"UID 必须为数字: {', '.join(invalid[:10])}")
+
+    job_id = await video_recommendation.submit_tuijian_batch(uids)
+    if job_id is None:
+        return create_error_response(500, "提交批量推荐任务失败")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "code": 202,
+            "message": "批量推荐任务已提交，将在后台进行处理。",
+            "data": {"job_id": job_id, "uid_count": len(uids)},
+        },
+    )
+
+
+@router.get("/tuijian/batch/{job_id}")
+async def get_tuijian_batch_status(
+    job_id: str, current_user: User = Depends(get_current_user)
+):
+    """
+    查询批量推荐任务进度
+    """
+    job_status = global_redis.get_job_status(job_id)
+    if job_status is None:
+        return create_error_response(404, "未找到该批量推荐任务")
+    return JSONResponse(
+        status_code=200,
+        content={"code": 200, "message": "success", "data": job_status},
+    )
+
+
 @router.get("/get_tuijian_video_info/{uid}")
 async def get_video_by_user(uid: int, current_user: User = Depends(get_current_user)):
     global_redis.redis_value_add("chuli")
@@ -561,13 +803,9 @@ async def get_video_by_user(uid: int, current_user: User = Depends(get_current_u
 
         # 解析JSON数据
         bvs = json.loads(bv_data)
-        bv_dict = {}
 
-        # 获取每个BV号的视频信息
-        for bv in bvs:
-            video_info = await video_recommendation.get_video_info(bv)
-            if video_info:
-                bv_dict[bv] = video_info
+        # 批量获取视频信息：缓存命中直接返回，未命中的并发请求
+        bv_dict = await video_recommendation.get_video_infos(bvs)
 
         return JSONResponse(
             status_code=200,
@@ -579,6 +817,9 @@ async def get_video_by_user(uid: int, current_user: User = Depends(get_current_u
             status_code=500,
             content={"code": 500, "message": "数据格式错误，无法解析推荐视频数据"},
         )
+    except CookiePoolExhausted as e:
+        logger.warning(str(e))
+        return create_error_response(503, str(e))
     except Exception as e:
         print(f"获取视频详情失败: {e}")
         return JSONResponse(
@@ -589,16 +830,22 @@ async def get_video_by_user(uid: int, current_user: User = Depends(get_current_u
 
 @router.post("/insert_vector/{bv_id}")
 async def insert_vector_by_bv(
-    bv_id: str, current_user: User = Depends(get_current_user)
+    bv_id: str,
+    force: bool = Query(False, description="已入库时是否强制重新计算向量"),
+    current_user: User = Depends(get_current_user),
 ):
     """
     将指定BV号的视频标签向量插入到向量数据库
     """
     try:
-        await video_recommendation.insert_vector_by_BV(bv_id)
+        submitted = await video_recommendation.insert_vector_by_BV(bv_id, force)
         return JSONResponse(
             status_code=200,
-            content={"code": 200, "message": "向量插入成功", "data": {"bv_id": bv_id}},
+            content={
+                "code": 200,
+                "message": "向量插入成功" if submitted else "该视频已在向量库中",
+                "data": {"bv_id": bv_id, "skipped": not submitted},
+            },
         )
     except Exception as e:
         print(f"插入向量失败: {e}")
@@ -625,6 +872,9 @@ async def get_video_info(bv_id: str, current_user: User = Depends(get_current_us
                 status_code=404,
                 content={"code": 404, "message": "获取视频信息失败", "data": None},
             )
+    except CookiePoolExhausted as e:
+        logger.warning(str(e))
+        return create_error_response(503, str(e))
     except Exception as e:
         print(f"获取视频信息失败: {e}")
         return JSONResponse(
@@ -743,8 +993,9 @@ async def poll_bilibili_login_endpoint(current_user: User = Depends(get_current_
                     # Create new cookie with just SESSDATA and bili_jct
                     new_cookie = f"SESSDATA={session_data['sessdata']}; bili_jct={session_data['bili_jct']}"
 
-                # Save the updated cookie to Redis
+                # Save the updated cookie to Redis and register it in the cookie pool
                 global_redis.redis_set_by_key("cookie", new_cookie)
+                await CookiePool(KIND_BILIBILI).add(new_cookie)
 
                 logger.info(
                     f"用户 {current_user.username} Bilibili登录成功，已更新cookie"
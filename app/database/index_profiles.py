@@ -0,0 +1,66 @@
+import os
+
+# ANN 索引方案：建索引参数 + 对应的检索参数，按集合选择
+INDEX_PROFILES = {
+    # 精确检索，作为召回率基准
+    "flat": {
+        "index_type": "FLAT",
+        "params": {},
+        "search_params": {},
+    },
+    "ivf_flat": {
+        "index_type": "IVF_FLAT",
+        "params": {"nlist": 1024},
+        "search_params": {"nprobe": 10},
+    },
+    # 标量量化，内存约为 IVF_FLAT 的 1/4，召回略低
+    "ivf_sq8": {
+        "index_type": "IVF_SQ8",
+        "params": {"nlist": 1024},
+        "search_params": {"nprobe": 16},
+    },
+    "hnsw": {
+        "index_type": "HNSW",
+        "params": {"M": 16, "efConstruction": 200},
+        "search_params": {"ef": 64},
+    },
+}
+METRIC_TYPE = "COSINE"
+# Milvus 地址，服务端（MilvusClient）、建集合脚本和压测共用
+MILVUS_URI = os.getenv("MILVUS_URI", "http://192.168.2.118:19530")
+DEFAULT_INDEX_PROFILE = os.getenv("MILVUS_INDEX_PROFILE", "ivf_flat")
+
+
+def profile_name_for(collection_name: str) -> str:
+    """
+    集合使用的索引方案：MILVUS_INDEX_PROFILE_<集合名大写> 优先，其次 MILVUS_INDEX_PROFILE
+    """
+    return os.getenv(f"MILVUS_INDEX_PROFILE_{collection_name.upper()}", DEFAULT_INDEX_PROFILE)
+
+
+def get_index_profile(name: str) -> dict:
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"未知的索引方案: {name}，可选: {', '.join(INDEX_PROFILES)}")
+    return INDEX_PROFILES[name]
+
+
+def index_params(name: str) -> dict:
+    """
+    建索引时传给 Milvus 的 index_params
+    """
+    profile = get_index_profile(name)
+    return {"index_type": profile["index_type"], "metric_type": METRIC_TYPE, "params": dict(profile["params"])}
+
+
+def search_params(name: str, **overrides) -> dict:
+    """
+    检索时使用的参数，可用 overrides 临时调整（如 nprobe、ef）
+    """
+    return {**get_index_profile(name)["search_params"], **overrides}
+
+
+def milvus_search_params(name: str, **overrides) -> dict:
+    """
+    传给 Milvus search 的 search_params（metric_type + params），线上检索与压测共用
+    """
+    return {"metric_type": METRIC_TYPE, "params": search_params(name, **overrides)}
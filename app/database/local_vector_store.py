@@ -0,0 +1,218 @@
+import json
+import os
+import numpy as np
+
+VECTOR_STORE_PATH = os.getenv(
+    "VECTOR_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bilibili_nlp", "vectors"),
+)
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")  # float32 或 float16
+VECTOR_DIM = 768
+INITIAL_CAPACITY = 1024
+# 向量数达到该值后自动建立 IVF 分区，设为 0 表示始终精确检索
+IVF_MIN_SIZE = int(os.getenv("VECTOR_STORE_IVF_MIN_SIZE", 0))
+IVF_NPROBE = int(os.getenv("VECTOR_STORE_IVF_NPROBE", 8))
+KMEANS_ITERATIONS = 10
+SEARCH_CHUNK = 65536  # float16 存储时按块转换为 float32 计算，避免一次性复制整张表
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def write_json_atomic(path: str, data) -> None:
+    """
+    先写临时文件再 os.replace，进程中途退出时不会留下写了一半的文件
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class LocalVectorStore:
+    """
+    进程内向量库，与 MilvusClient 提供相同的 insert_vector / search_similar 接口。
+    向量归一化后存放在磁盘上的内存映射矩阵中，余弦相似度即点积；
+    数据量较大时可建立 IVF 分区，只在最近的 nprobe 个分区内检索。
+
+    目录结构: meta.json（维度、类型、数量、容量）、vectors.bin（矩阵）、
+    ids.jsonl（每行一个 video_id，与矩阵行号对应，新 id 只追加，不重写整个文件）
+    """
+    def __init__(self, path: str = VECTOR_STORE_PATH, dim: int = VECTOR_DIM, dtype: str = VECTOR_STORE_DTYPE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.vectors_path = os.path.join(path, "vectors.bin")
+        self.ids_path = os.path.join(path, "ids.jsonl")
+        self.legacy_ids_path = os.path.join(path, "ids.json")
+        self.ivf_path = os.path.join(path, "ivf_centroids.npy")
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.dtype = meta["dim"], np.dtype(meta["dtype"])
+            self.count, self.capacity = meta["count"], meta["capacity"]
+            self.ids: list[str] = self._load_ids()
+        else:
+            self.dim, self.dtype = dim, np.dtype(dtype)
+            self.count, self.capacity = 0, INITIAL_CAPACITY
+            self.ids = []
+            with open(self.vectors_path, "wb") as f:
+                f.truncate(self.capacity * self.dim * self.dtype.itemsize)
+            open(self.ids_path, "wb").close()
+        self.matrix = self._open_matrix()
+        self.row_of = {vid: row for row, vid in enumerate(self.ids)}
+
+        self.centroids: np.ndarray | None = None
+        self.assignments: np.ndarray | None = None
+        self._lists: list[np.ndarray] | None = None  # 每个分区的行号，按需从 assignments 重建
+        if os.path.exists(self.ivf_path) and self.count:
+            self.centroids = np.load(self.ivf_path)
+            self.assignments = self._assign(np.arange(self.count))
+
+    def _open_matrix(self) -> np.memmap:
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim))
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        while self.capacity < needed:
+            self.capacity *= 2
+        self.matrix.flush()
+        del self.matrix
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(self.capacity * self.dim * self.dtype.itemsize)
+        self.matrix = self._open_matrix()
+
+    def _load_ids(self) -> list[str]:
+        if not os.path.exists(self.ids_path) and os.path.exists(self.legacy_ids_path):
+            # 旧版把全部 id 存成一个 JSON 数组，转换为逐行格式
+            with open(self.legacy_ids_path, "r", encoding="utf-8") as f:
+                self._append_ids(json.load(f)[:self.count])
+            os.remove(self.legacy_ids_path)
+        with open(self.ids_path, "r+b") as f:
+            ids = [json.loads(f.readline()) for _ in range(self.count)]
+            # 追加 id 之后、写 meta 之前退出时会多出几行（可能不完整），以 meta 中的 count 为准丢弃
+            f.truncate(f.tell())
+        return ids
+
+    def _append_ids(self, video_ids: list[str]) -> None:
+        if not video_ids:
+            return
+        with open(self.ids_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(vid, ensure_ascii=False) + "\n" for vid in video_ids)
+
+    def _save_meta(self) -> None:
+        self.matrix.flush()
+        write_json_atomic(self.meta_path, {"dim": self.dim, "dtype": self.dtype.name,
+                                           "count": self.count, "capacity": self.capacity})
+
+    def _rows(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        return np.argmax(self._rows(rows) @ self.centroids.T, axis=1) # type: ignore
+
+    async def insert_vector(self, video_ids: list[str], embeddings: list[list[float]]) -> None:
+        """
+        写入向量；video_id 已存在时原地覆盖
+        """
+        vectors = normalize(embeddings)
+        new_ids = [vid for vid in dict.fromkeys(video_ids) if vid not in self.row_of]
+        self._grow(self.count + len(new_ids))
+        for vid in new_ids:
+            self.row_of[vid] = self.count
+            self.ids.append(vid)
+            self.count += 1
+        rows = np.array([self.row_of[vid] for vid in video_ids], dtype=np.int64)
+        self.matrix[rows] = vectors.astype(self.dtype)
+
+        if self.centroids is not None:
+            if self.assignments is None or len(self.assignments) < self.count:
+                grown = np.full(self.count, -1, dtype=np.int64)
+                if self.assignments is not None:
+                    grown[:len(self.assignments)] = self.assignments
+                self.assignments = grown
+            self.assignments[rows] = self._assign(rows)
+            self._lists = None
+        elif IVF_MIN_SIZE and self.count >= IVF_MIN_SIZE:
+            self.build_ivf()
+        # 先追加 ids 再写 meta：meta 中的 count 不会超过已落盘的 ids 数量
+        self._append_ids(new_ids)
+        self._save_meta()
+
+    def build_ivf(self, nlist: int | None = None, seed: int = 0) -> None:
+        """
+        用 k-means 把现有向量划分为 nlist 个分区（默认 sqrt(n)），质心持久化到磁盘
+        """
+        if self.count == 0:
+            return
+        nlist = min(self.count, nlist or max(1, int(np.sqrt(self.count))))
+        rng = np.random.default_rng(seed)
+        data = self._rows(np.arange(self.count))
+        centroids = data[rng.choice(self.count, nlist, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # 空分区保留原质心
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        self.centroids = centroids
+        self.assignments = np.argmax(data @ centroids.T, axis=1)
+        self._lists = None
+        np.save(self.ivf_path, centroids)
+
+    def _inverted_lists(self) -> list[np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable") # type: ignore
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1)) # type: ignore
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))] # type: ignore
+        return self._lists
+
+    def search_batch(self, query_embeddings: list[list[float]], top_k: int = 5,
+                     nprobe: int = IVF_NPROBE, exact: bool = False) -> list[list[tuple[str, float]]]:
+        """
+        批量检索，返回每个查询的 [(video_id, 余弦相似度), ...]。
+        exact 为 True 或 nprobe <= 0 时即使已建立 IVF 分区也做全量精确检索
+        """
+        if self.count == 0:
+            return [[] for _ in query_embeddings]
+        queries = normalize(np.atleast_2d(query_embeddings))
+        use_ivf = not exact and nprobe > 0 and self.centroids is not None and self.assignments is not None
+        results = []
+        for query in queries:
+            if use_ivf:
+                probes = top_k_indices(self.centroids @ query, nprobe)
+                lists = self._inverted_lists()
+                rows = np.sort(np.concatenate([lists[p] for p in probes]))
+                scores = self._rows(rows) @ query
+                best = top_k_indices(scores, top_k)
+                results.append([(self.ids[rows[i]], float(scores[i])) for i in best])
+                continue
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, SEARCH_CHUNK):
+                end = min(start + SEARCH_CHUNK, self.count)
+                scores[start:end] = np.asarray(self.matrix[start:end], dtype=np.float32) @ query
+            best = top_k_indices(scores, top_k)
+            results.append([(self.ids[i], float(scores[i])) for i in best])
+        return results
+
+    async def search_similar_batch(self, query_embeddings: list[list[float]], top_k=5) -> list[list[str]]:
+        return [[vid for vid, _ in hits] for hits in self.search_batch(query_embeddings, top_k)]
+
+    async def search_similar(self, query_embedding: list[float], top_k=5) -> list[str]:
+        return [vid for vid, _ in self.search_batch([query_embedding], top_k)[0]]
@@ -1,4 +1,5 @@
 from pymilvus import AsyncMilvusClient
+from app.database.index_profiles import MILVUS_URI, milvus_search_params, profile_name_for
 
 class MilvusClient:
     _instance = None
@@ -15,23 +16,40 @@ class MilvusClient:
             return
         self.alias = "default"
         self.collection_name = collection_name
-        self.collection = AsyncMilvusClient(uri="http://192.168.2.118:19530")
+        # 检索参数与建索引时使用的方案保持一致
+        self.index_profile = profile_name_for(collection_name)
+        self.search_params = milvus_search_params(self.index_profile)
+        self.collection = AsyncMilvusClient(uri=MILVUS_URI)
 
-        print(f"已连接集合: {self.collection_name}")
+        print(f"已连接集合: {self.collection_name}（索引方案 {self.index_profile}）")
         MilvusClient._initialized = True
 
     async def insert_vector(self, video_ids: list[str], embeddings: list[list[float]]) -> None:
-        # 只插入video_id和embedding，id字段会自动生成
-        entities = []
+        # video_id 是主键，使用 upsert 保证同一视频只保留一行；同批内重复的以最后一次为准
+        entities = {}
         for vid, emb in zip(video_ids, embeddings):
-            entities.append({
+            entities[vid] = {
                 "video_id": vid,   # 确保这里传入的是 string 类型 (VARCHAR)
                 "embedding": emb   # 确保这里传入的是 float list 类型 (FLOAT_VECTOR)
-            })
+            }
 
-        await self.collection.insert(collection_name=self.collection_name, data=entities)
+        await self.collection.upsert(collection_name=self.collection_name, data=list(entities.values()))
 
 
+    async def search_similar_batch(self, query_embeddings: list[list[float]], top_k=5) -> list[list[str]]:
+        """
+        一次请求检索多个查询向量，返回与查询一一对应的 video_id 列表
+        """
+        results = await self.collection.search(
+                collection_name=self.collection_name,
+                data=query_embeddings,
+                anns_field="embedding",
+                limit=top_k,
+                output_fields=["video_id"],
+                search_params=self.search_params,
+            )
+        return [[hit.video_id for hit in hits] for hits in results] # type: ignore
+
     async def search_similar(self, query_embedding: list[float], top_k=5) -> list[str]:
         results = await self.collection.search(
                 collection_name=self.collection_name,
@@ -39,8 +57,7 @@ class MilvusClient:
                 anns_field="embedding",
                 limit=top_k,
                 output_fields=["video_id"],
-                metric_type="COSINE", 
-                params={"nprobe": 10},
+                search_params=self.search_params,
             )
         video_ids = []
         for hits in results: # type: ignore
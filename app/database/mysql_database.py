@@ -194,6 +194,34 @@ def add_uuid_history(
         conn.close()
 
 
+def add_uuid_history_batch(username: str, data_by_uid: Dict[str, str], job_id: str = "none") -> None:
+    """
+    批量记录 UID 查询历史，与 add_uuid_history 相同的 upsert，一次 executemany 提交
+    """
+    if not data_by_uid:
+        return
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    query = """
+        INSERT INTO uuid_history (uuid, user, time, data, job_id) 
+        VALUES (%s, %s, NOW(), %s, %s) 
+        ON DUPLICATE KEY UPDATE time = NOW(), user = %s, data = %s, job_id = %s
+    """
+    try:
+        cursor.executemany(query, [
+            (uid, username, data, job_id, username, data, job_id) for uid, data in data_by_uid.items()
+        ])
+        conn.commit()
+    except mysql.connector.Error as err:
+        logger.error(f"Failed to add UID history: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+
 def get_bv_history(username: str):
     """Fetches BV search history for a user."""
     conn = get_db_connection()
@@ -382,6 +410,19 @@ async def get_history_by_user(
         conn.close()
 
 
+USER_COMMENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS user_comments (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        uid INT NOT NULL,
+        username VARCHAR(255) NOT NULL,
+        comment_text TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_uid (uid),
+        INDEX idx_username (username)
+    )
+"""
+
+
 def save_user_comments(uid: int | str, username: str, comments: List[Dict[str, Any]]) -> bool:
     """
     保存用户评论到数据库
@@ -394,17 +435,7 @@ def save_user_comments(uid: int | str, username: str, comments: List[Dict[str, A
 
     try:
         # 首先检查是否存在user_comments表，如果不存在则创建
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_comments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                uid INT NOT NULL,
-                username VARCHAR(255) NOT NULL,
-                comment_text TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_uid (uid),
-                INDEX idx_username (username)
-            )
-        """)
+        cursor.execute(USER_COMMENTS_TABLE_SQL)
 
         # 删除该用户之前的评论数据（可选，取决于是否需要保留历史）
         cursor.execute("DELETE FROM user_comments WHERE uid = %s", (uid,))
@@ -431,6 +462,47 @@ def save_user_comments(uid: int | str, username: str, comments: List[Dict[str, A
         conn.close()
 
 
+def save_user_comments_batch(username: str, comments_by_uid: Dict[str, List[Dict[str, Any]]]) -> bool:
+    """
+    批量保存多个用户的评论：一次删除旧数据，executemany 插入新数据，整批在一个事务里提交
+    """
+    if not comments_by_uid:
+        return True
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(USER_COMMENTS_TABLE_SQL)
+        uids = list(comments_by_uid)
+        placeholders = ", ".join(["%s"] * len(uids))
+        cursor.execute(f"DELETE FROM user_comments WHERE uid IN ({placeholders})", uids)
+        rows = [
+            (uid, username, comment["comment_text"])
+            for uid, comments in comments_by_uid.items()
+            for comment in comments
+            if comment.get("comment_text")
+        ]
+        if rows:
+            cursor.executemany(
+                "INSERT INTO user_comments (uid, username, comment_text) VALUES (%s, %s, %s)",
+                rows,
+            )
+        conn.commit()
+        logger.info(f"批量保存 {len(rows)} 条评论到数据库，共 {len(uids)} 个UID")
+        return True
+
+    except mysql.connector.Error as err:
+        logger.error(f"批量保存用户评论失败: {err}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
 def get_user_comments(uid: str) -> List[Dict[str, Any]]:
     """
     从数据库获取用户评论
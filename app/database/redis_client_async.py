@@ -1,3 +1,4 @@
+import json
 import redis.asyncio as redis
 import asyncio
 
@@ -34,12 +35,61 @@ class RedisClientAsync:
         return await self.redis_client.set(key, value, ex=ex)
 
 
+    async def lpush(self, key, *values):
+        return await self.redis_client.lpush(key, *values) # type: ignore
+
+    async def expire(self, key, seconds):
+        return await self.redis_client.expire(key, seconds)
+
+    async def push_reply(self, key, value, ex=60):
+        """
+        写入一条应答并设置过期时间，请求方超时放弃后应答也不会一直残留
+        """
+        pipe = self.redis_client.pipeline()
+        pipe.lpush(key, value)
+        pipe.expire(key, ex)
+        await pipe.execute()
+
+    async def blpop(self, key, timeout=0):
+        """
+        阻塞弹出，超时返回 None，否则返回值本身
+        """
+        result = await self.redis_client.blpop([key], timeout=timeout) # type: ignore
+        return result[1] if result else None
+
+    async def sadd(self, key, *members):
+        return await self.redis_client.sadd(key, *members) # type: ignore
+
+    async def sismember(self, key, member) -> bool:
+        return bool(await self.redis_client.sismember(key, member)) # type: ignore
+
+    async def smismember(self, key, members: list) -> list[bool]:
+        if not members:
+            return []
+        return [bool(flag) for flag in await self.redis_client.smismember(key, members)] # type: ignore
+
+    async def set_job_status(self, job_id: str, status: dict, ttl: int = 3600):
+        """
+        与 RedisClient.set_job_status 相同的 job_status:{job_id} 格式，供 API 侧查询后台任务进度
+        """
+        await self.redis_client.set(f"job_status:{job_id}", json.dumps(status), ex=ttl)
+
     async def get_streams(self, stream_name) -> list:
         return await self.redis_client.xread({stream_name: "$"}, count=1, block=0) # type: ignore
 
     async def get_streams_from_id(self, stream_name, last_id='0') -> list:
         return await self.redis_client.xread({stream_name: last_id}, count=1, block=0) # type: ignore
     
+    async def read_streams(self, stream_name, last_id='$', count=1, block=0) -> list[tuple[str, dict]]:
+        """
+        从 last_id 之后读取最多 count 条消息，返回 [(msg_id, fields), ...]；
+        block 为毫秒，超时没有新消息时返回空列表
+        """
+        result = await self.redis_client.xread({stream_name: last_id}, count=count, block=block) # type: ignore
+        if not result:
+            return []
+        return result[0][1]
+
     async def del_stream_key(self, stream_name, msg_id):
         await self.redis_client.xdel(stream_name, msg_id)
 
@@ -0,0 +1,23 @@
+import os
+
+# milvus: 远程 Milvus 服务（默认）；local: 进程内 LocalVectorStore，无需外部服务
+VECTOR_STORE = os.getenv("VECTOR_STORE", "milvus")
+
+_store = None
+
+
+def get_vector_store():
+    """
+    按 VECTOR_STORE 返回向量库实例，两种实现都提供 insert_vector / search_similar
+    """
+    global _store
+    if _store is None:
+        if VECTOR_STORE == "local":
+            from app.database.local_vector_store import LocalVectorStore
+            _store = LocalVectorStore()
+        elif VECTOR_STORE == "milvus":
+            from app.database.milvus_client import MilvusClient
+            _store = MilvusClient()
+        else:
+            raise ValueError(f"未知的 VECTOR_STORE: {VECTOR_STORE}")
+    return _store
@@ -1,19 +1,26 @@
+import os
 import subprocess
 import sys
 import signal
 import time
+from app.worker.utils.embedding_client import DEFAULT_EMBEDDING_SERVER
 
 def main():
     processes = []
 
+    # 模型只在向量服务中加载一份，向量 Worker 通过 EMBEDDING_SERVER 连接它
+    env = dict(os.environ)
+    env.setdefault("EMBEDDING_SERVER", DEFAULT_EMBEDDING_SERVER)
+
     commands = [
+        ["start-embedding"],
         ["start-api"],
         ["start-vector"],
         ["start-video"],
     ]
 
     for cmd in commands:
-        p = subprocess.Popen(cmd)
+        p = subprocess.Popen(cmd, env=env)
         processes.append(p)
 
     def cleanup_processes():
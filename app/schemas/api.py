@@ -6,6 +6,10 @@ class CookieData(BaseModel):
     cookie: str
 
 
+class BulkUidRequest(BaseModel):
+    uids: List[str]
+
+
 class ChatMessage(BaseModel):
     role: str
     content: str
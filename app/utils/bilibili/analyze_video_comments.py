@@ -1,5 +1,5 @@
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from app.database.redis_client_async import RedisClientAsync
 import asyncio
 
@@ -15,7 +15,8 @@ async def analyze_comments(comments: List[Dict[str, Any]], bv_id: str):
     # 1. 确保原始数据已存入 Redis (Worker 需要读这个)
     await redis_client.set(bv_id, json.dumps(comments, ensure_ascii=False))
     
-    # 2. 发送任务到 Stream
+    # 2. 清掉上一次的结果后发送任务到 Stream，避免轮询拿到旧结果
+    await redis_client.redis_client.delete(f"comment_analysis_{bv_id}")
     await redis_client.add_streams(STREAMS_NAME, {'BV': bv_id})
     
     # 3. 轮询等待结果 (Worker 完成后会写入 comment_analysis_{bv_id})
@@ -35,6 +36,47 @@ async def analyze_comments(comments: List[Dict[str, Any]], bv_id: str):
         await asyncio.sleep(2)
     
     return {"error": "分析引擎响应超时"}
+
+async def analyze_comments_streaming(
+    bv_id: str,
+    on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    提交流式分析任务：Worker 自己边抓取边分析，这里只轮询阶段性结果和最终结果
+    """
+    # 先清掉上一次的结果，否则轮询会立即拿到旧结果
+    await redis_client.redis_client.delete(f"comment_analysis_{bv_id}", f"comment_analysis_partial_{bv_id}")
+    await redis_client.add_streams(STREAMS_NAME, {'BV': bv_id, 'stream': '1'})
+
+    max_retries = 120 # 约 2 分钟超时
+    for _ in range(max_retries):
+        analysis_data = await redis_client.get(f"comment_analysis_{bv_id}")
+        if analysis_data:
+            try:
+                result = json.loads(analysis_data)
+                if isinstance(result, dict):
+                    return result
+            except Exception:
+                pass
+        if on_progress is not None:
+            partial = await get_partial_analysis(bv_id)
+            if partial:
+                await on_progress(partial)
+        await asyncio.sleep(1)
+
+    return {"error": "分析引擎响应超时"}
+
+async def get_partial_analysis(bv_id: str) -> Dict[str, Any]:
+    """
+    获取流式分析过程中的阶段性结果
+    """
+    data = await redis_client.get(f"comment_analysis_partial_{bv_id}")
+    if data:
+        try:
+            return json.loads(data)
+        except Exception:
+            return {}
+    return {}
     
 async def get_analysis_from_redis(bv_id: str) -> Dict[str, Any]:
     """
@@ -0,0 +1,142 @@
+"""
+爬虫压测：启动本地 mock_server（或使用 --base-url 指定已运行的替身），
+用真实的抓取代码跑一遍，报告 pages/sec 以及单请求 p50/p99 延迟。
+
+    python -m app.utils.bilibili.bench_crawler --target comments --videos 20 --pages 10
+    python -m app.utils.bilibili.bench_crawler --target aicu --videos 20 --pages 5   # aicu 用户评论，--videos 为用户数
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def _wait_until_ready(base_url: str, timeout: float = 15) -> None:
+    import httpx
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/x/web-interface/view?bvid=ready")
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"mock server 未在 {timeout}s 内就绪: {base_url}")
+
+
+async def run_bench(args) -> dict:
+    # 这些模块在导入时读取环境变量，必须在设置好 BILIBILI_API_BASE 等之后再导入
+    from app.utils.bilibili import get_video_comments, get_user_comments, video_recommendation, rate_limiter
+    from app.utils.bilibili.http_client import get_http_client, close_http_client
+
+    for endpoint in rate_limiter.ENDPOINT_RATES:
+        rate_limiter.ENDPOINT_RATES[endpoint] = args.rate
+    rate_limiter.MAX_RATE = max(rate_limiter.MAX_RATE, args.rate)
+
+    latencies: list[float] = []
+
+    async def on_request(request):
+        request.extensions["bench_start"] = time.perf_counter()
+
+    async def on_response(response):
+        latencies.append(time.perf_counter() - response.request.extensions["bench_start"])
+
+    client = get_http_client()
+    client.event_hooks["request"].append(on_request)
+    client.event_hooks["response"].append(on_response)
+
+    bvs = [f"BV1mock{i:05d}" for i in range(args.videos)]
+    semaphore = asyncio.Semaphore(args.videos_concurrency)
+
+    async def one(bv: str) -> int:
+        async with semaphore:
+            if args.target == "comments":
+                comments = await get_video_comments.get_comments(bv, args.pages, expand_replies=args.expand)
+                return len(comments)
+            if args.target == "aicu":
+                # 只走抓取路径，不写 Redis、不通知向量 Worker
+                uid = bv.removeprefix("BV1mock")
+                return len(await get_user_comments.fetch_user_comments(uid, max_pages=args.pages) or [])
+            if args.target == "view":
+                return int(await video_recommendation.fetch_video_info(bv) is not None)
+            # main_vector 依赖 pymilvus 等向量库客户端，只在压测 tag 接口时才导入（模型在 run() 中才加载）
+            from app.worker import main_vector
+            return int(await main_vector.fetch_video_tags(bv, client) is not None)
+
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(one(bv) for bv in bvs))
+    elapsed = time.perf_counter() - start
+    await close_http_client()
+
+    return {
+        "target": args.target,
+        "requests": len(latencies),
+        "items": sum(counts),
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="基于本地 mock_server 的爬虫压测")
+    parser.add_argument("--target", choices=["comments", "view", "tag", "aicu"], default="comments")
+    parser.add_argument("--base-url", default="", help="已运行的 mock_server 地址，留空则自动启动一个")
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--videos-concurrency", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--expand", action="store_true", help="同时展开楼中楼")
+    parser.add_argument("--rate", type=float, default=1000, help="压测时每个令牌桶的速率")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([
+            sys.executable, "-m", "app.utils.bilibili.mock_server", "--port", str(port),
+            "--latency-ms", str(args.latency_ms), "--error-rate", str(args.error_rate),
+            "--throttle-rate", str(args.throttle_rate), "--pages", str(args.pages),
+            "--user-comments", str(args.pages * 100),  # aicu 每页 100 条，使每个用户恰好有 --pages 页
+        ])
+
+    os.environ["BILIBILI_API_BASE"] = base_url
+    os.environ["AICU_API_BASE"] = base_url
+    os.environ["COOKIE_POOL_ENABLED"] = "0"
+    os.environ.setdefault("BILIBILI_CACHE_PATH", os.path.join(tempfile.gettempdir(), "bilibili_nlp_bench.sqlite3"))
+
+    try:
+        asyncio.run(_wait_until_ready(base_url))
+        result = asyncio.run(run_bench(args))
+        for key, value in result.items():
+            print(f"{key:>12}: {value}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
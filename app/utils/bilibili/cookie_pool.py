@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import os
+import random
+import time
+from typing import Callable
+import httpx
+from app.database.redis_client_async import RedisClientAsync
+from app.utils.bilibili.rate_limiter import limited_get, is_throttled
+
+# 池的种类：bilibili 用于 api.bilibili.com，aicu 用于 api.aicu.cc
+KIND_BILIBILI = "bilibili"
+KIND_AICU = "aicu"
+
+MAX_HEALTH = 100
+MIN_HEALTH = 10            # 低于该分数时进入较长的恢复期，期满后以该分数重新参与调度
+SUCCESS_REWARD = 1
+FAILURE_PENALTY = 5
+THROTTLE_PENALTY = 20
+# 设为 0 时不访问 Redis，直接使用各调用方的默认 cookie（用于本地压测）
+COOKIE_POOL_ENABLED = os.getenv("COOKIE_POOL_ENABLED", "1") == "1"
+FAILURE_COOLDOWN = int(os.getenv("COOKIE_FAILURE_COOLDOWN", 10))
+THROTTLE_COOLDOWN = int(os.getenv("COOKIE_THROTTLE_COOLDOWN", 60))
+RECOVERY_COOLDOWN = int(os.getenv("COOKIE_RECOVERY_COOLDOWN", 600))
+# 池中账号全部冷却时 acquire 最多等待的秒数，超时抛出 CookiePoolExhausted（API 层返回 503）
+COOKIE_ACQUIRE_TIMEOUT = float(os.getenv("COOKIE_ACQUIRE_TIMEOUT", 30))
+
+
+class CookiePoolExhausted(Exception):
+    """
+    池中账号全部处于冷却期，且在等待时限内没有账号恢复
+    """
+
+
+def pool_key(kind: str) -> str:
+    return f"cookie_pool:{kind}"
+
+def health_key(kind: str) -> str:
+    return f"cookie_pool_health:{kind}"
+
+def cooldown_key(kind: str, cookie_id: str) -> str:
+    return f"cookie_pool_cooldown:{kind}:{cookie_id}"
+
+def make_cookie_id(cookie: str) -> str:
+    return hashlib.sha1(cookie.encode("utf-8")).hexdigest()[:12]
+
+def choose_cookie(scores: list[tuple[str, float]], ttls: list[int]) -> str | None:
+    """
+    在未冷却的 cookie 中按健康度加权随机选择一个；ttls 为各冷却 key 的 PTTL（-2 表示不在冷却）。
+    健康度低于 MIN_HEALTH 的（旧数据）按 MIN_HEALTH 计权，使其仍有机会恢复
+    """
+    candidates = [(cid, max(score, MIN_HEALTH)) for (cid, score), ttl in zip(scores, ttls) if ttl == -2]
+    if not candidates:
+        return None
+    ids, weights = zip(*candidates)
+    return random.choices(ids, weights=weights, k=1)[0]
+
+def cooldown_wait(ttls: list[int]) -> float:
+    """
+    所有 cookie 都在冷却时，距最早一个冷却结束的秒数
+    """
+    remaining = [ttl for ttl in ttls if ttl > 0]
+    return max(min(remaining) / 1000, 0.05) if remaining else 1.0
+
+def penalty_for(throttled: bool) -> tuple[int, int]:
+    return (THROTTLE_PENALTY, THROTTLE_COOLDOWN) if throttled else (FAILURE_PENALTY, FAILURE_COOLDOWN)
+
+def recovery(score: float, cooldown: int) -> tuple[float | None, int]:
+    """
+    扣分后健康度跌破 MIN_HEALTH 时进入 RECOVERY_COOLDOWN 恢复期，健康度直接恢复为 MIN_HEALTH，
+    期满后以低权重重新试用、成功后逐步加分。返回 (需要重置的健康度或 None, 冷却秒数)
+    """
+    if score < MIN_HEALTH:
+        return MIN_HEALTH, max(cooldown, RECOVERY_COOLDOWN)
+    return None, cooldown
+
+
+class CookiePool:
+    """
+    Redis 中的多账号 cookie 池：
+    cookie_pool:{kind} 保存 id -> cookie，cookie_pool_health:{kind} 保存健康分，
+    cookie_pool_cooldown:{kind}:{id} 存在即表示该 cookie 处于冷却期。
+    池为空时回退到旧的单 cookie key，保证未配置池的部署行为不变；池不为空时从不回退。
+    """
+    def __init__(self, kind: str = KIND_BILIBILI, fallback_key: str | None = None):
+        self.kind = kind
+        self.fallback_key = fallback_key
+        self.redis = RedisClientAsync().redis_client
+
+    async def add(self, cookie: str) -> str:
+        cookie_id = make_cookie_id(cookie)
+        pipe = self.redis.pipeline()
+        pipe.hset(pool_key(self.kind), cookie_id, cookie)
+        pipe.zadd(health_key(self.kind), {cookie_id: MAX_HEALTH})
+        pipe.delete(cooldown_key(self.kind, cookie_id))
+        await pipe.execute()
+        return cookie_id
+
+    async def remove(self, cookie_id: str) -> bool:
+        pipe = self.redis.pipeline()
+        pipe.hdel(pool_key(self.kind), cookie_id)
+        pipe.zrem(health_key(self.kind), cookie_id)
+        pipe.delete(cooldown_key(self.kind, cookie_id))
+        removed, _, _ = await pipe.execute()
+        return bool(removed)
+
+    async def status(self) -> list[dict]:
+        scores = await self.redis.zrange(health_key(self.kind), 0, -1, withscores=True)
+        if not scores:
+            return []
+        pipe = self.redis.pipeline()
+        for cookie_id, _ in scores:
+            pipe.ttl(cooldown_key(self.kind, cookie_id))
+        ttls = await pipe.execute()
+        return [
+            {"cookie_id": cookie_id, "health": score, "cooldown": max(ttl, 0)}
+            for (cookie_id, score), ttl in zip(scores, ttls)
+        ]
+
+    async def acquire(self, timeout: float = COOKIE_ACQUIRE_TIMEOUT) -> tuple[str | None, str | None]:
+        """
+        返回 (cookie_id, cookie)；池为空时返回 (None, 回退 key 的 cookie)。
+        池中 cookie 全部冷却时等待最早的冷却结束，不回退到旧的单 cookie；
+        累计等待超过 timeout 秒仍无可用账号时抛出 CookiePoolExhausted
+        """
+        if not COOKIE_POOL_ENABLED:
+            return None, None
+        deadline = time.monotonic() + timeout
+        while True:
+            scores = await self.redis.zrange(health_key(self.kind), 0, -1, withscores=True)
+            if not scores:
+                break
+            pipe = self.redis.pipeline()
+            for cookie_id, _ in scores:
+                pipe.pttl(cooldown_key(self.kind, cookie_id))
+            ttls = await pipe.execute()
+            cookie_id = choose_cookie(scores, ttls)
+            if cookie_id is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CookiePoolExhausted(f"{self.kind} cookie 池中的账号全部处于冷却期，{timeout:g} 秒内没有可用账号")
+                await asyncio.sleep(min(cooldown_wait(ttls), remaining))
+                continue
+            cookie = await self.redis.hget(pool_key(self.kind), cookie_id)
+            if cookie:
+                return cookie_id, cookie
+            # 健康分还在但 cookie 已被删除，清理后重选
+            await self.redis.zrem(health_key(self.kind), cookie_id)
+        if self.fallback_key:
+            return None, await self.redis.get(self.fallback_key)
+        return None, None
+
+    async def fetch(self, client: httpx.AsyncClient, endpoint: str, url: str,
+                    make_headers: Callable[[str | None], dict]) -> httpx.Response | None:
+        """
+        从池中取一个账号，经限流器发送 GET 请求并回报结果。make_headers 根据 cookie 构造请求头
+        （池为空且没有回退 cookie 时传入 None）。网络错误、非 200 或重试后仍被限流时返回 None
+        """
+        cookie_id, cookie = await self.acquire()
+        try:
+            response = await limited_get(client, endpoint, url, make_headers(cookie))
+        except httpx.HTTPError as e:
+            print(f"请求 {endpoint} 接口失败: {url}: {e}")
+            await self.report(cookie_id, ok=False)
+            return None
+        throttled = is_throttled(response)
+        ok = response.status_code == 200 and not throttled
+        await self.report(cookie_id, ok=ok, throttled=throttled)
+        if not ok:
+            print(f"请求 {endpoint} 接口失败: {url}: HTTP {response.status_code}{'（被限流）' if throttled else ''}")
+            return None
+        return response
+
+    async def report(self, cookie_id: str | None, ok: bool, throttled: bool = False) -> None:
+        """
+        回报一次请求结果：成功加分；失败扣分并冷却，被风控时扣得更多、冷却更久，
+        跌破 MIN_HEALTH 时进入恢复期
+        """
+        if cookie_id is None or not COOKIE_POOL_ENABLED:
+            return
+        if ok:
+            score = await self.redis.zincrby(health_key(self.kind), SUCCESS_REWARD, cookie_id)
+            if score > MAX_HEALTH:
+                await self.redis.zadd(health_key(self.kind), {cookie_id: MAX_HEALTH})
+            return
+        penalty, cooldown = penalty_for(throttled)
+        score = await self.redis.zincrby(health_key(self.kind), -penalty, cookie_id)
+        reset, cooldown = recovery(score, cooldown)
+        pipe = self.redis.pipeline()
+        if reset is not None:
+            pipe.zadd(health_key(self.kind), {cookie_id: reset})
+        pipe.set(cooldown_key(self.kind, cookie_id), 1, ex=cooldown)
+        await pipe.execute()
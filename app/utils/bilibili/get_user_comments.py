@@ -1,10 +1,24 @@
-from typing import List, Optional, Dict, Any, cast
+from typing import List, Optional, Dict, Any
 import subprocess
 from app.database.redis_client import RedisClient
+from app.database.redis_client_async import RedisClientAsync
+from app.utils.bilibili.cookie_pool import CookiePool, KIND_AICU
+from app.utils.bilibili.http_client import AICU_API_BASE, get_http_client
+from app.utils.bilibili import video_recommendation
+import asyncio
 import json
+import os
 import httpx
 
 redis_handler = RedisClient()
+cookie_pool_async = CookiePool(KIND_AICU, fallback_key='cookie_aicu')
+
+# aicu 每页条数（接口上限 100）
+USER_COMMENT_PAGE_SIZE = 100
+# 单个用户最多翻的页数，防止评论量极大的账号拖住整个任务
+USER_COMMENT_MAX_PAGES = int(os.getenv("AICU_MAX_PAGES", 20))
+# 单个用户同时在途的页面请求数
+USER_COMMENT_CONCURRENCY = int(os.getenv("AICU_CONCURRENCY", 4))
 
 def get_user_comments_simple_1(uid: int | str) -> List[Dict[str, Any]]:
     """
@@ -48,35 +62,88 @@ def get_user_comments_simple_1(uid: int | str) -> List[Dict[str, Any]]:
         print(f"获取评论时发生未知错误 for UID {uid}: {e}")
         return []
 
-def get_user_comments_simple(uid: int | str) -> List[Dict[str, Any]]:
+def get_user_comments_url(uid: int | str, page: int) -> str:
+    return (f"{AICU_API_BASE}/api/v3/search/getreply?"
+            f"uid={uid}&ps={USER_COMMENT_PAGE_SIZE}&pn={page}&mode=0&keyword=")
+
+async def fetch_user_comment_page(client: httpx.AsyncClient, uid: int | str, page: int,
+                                  semaphore: asyncio.Semaphore) -> dict | None:
     """
-    简单的用户评论获取函数，使用subprocess调用curl，直接获取评论数据，并保存到Redis
+    请求 aicu 的一页用户评论，返回 data 字段；失败返回 None
     """
+    async with semaphore:
+        result = await cookie_pool_async.fetch(client, "aicu", get_user_comments_url(uid, page),
+                                               lambda cookie: {"cookie": cookie} if cookie else {})
+    if result is None:
+        return None
     try:
-        headers = {
-            "cookie": redis_handler.get("cookie_aicu")
-            }
-        headers = cast(dict[str, str], headers)
-        result = httpx.get(f"https://api.aicu.cc/api/v3/search/getreply?uid={uid}&ps=100&pn=1&mode=0&keyword=", headers=headers)
-        print(f"开始获取用户 {uid} 的评论...")
-        print(result.json())
-        data = result.json()
-        replies = data.get('data', {}).get('replies', [])
-        if not replies:
-            print(f"API返回空评论数据 for UID {uid}")
-            return []
-        user_comments = [{'comment_text': reply.get('message')} for reply in replies if reply.get('message')]
-        print(f"成功获取 {len(user_comments)} 条评论 for UID {uid}")
-        # 保存到Redis
-        redis_handler.set(str(uid), json.dumps(user_comments, ensure_ascii=False))
-        print(f"已保存到Redis，key={uid}")
-        return user_comments
+        payload = result.json()
+    except ValueError as e:
+        print(f"JSON解析失败 for UID {uid} 第 {page} 页: {e}")
+        return None
+    # 网关错误页等返回的可能是列表或字符串，同样按失败处理
+    data = payload.get('data') if isinstance(payload, dict) else None
+    return data if isinstance(data, dict) else None
 
-    except json.JSONDecodeError as e:
-        print(f"JSON解析失败 for UID {uid}: {e}")
-        print(f"响应内容: {result}...")
-        return []
-    except Exception as e:
-        print(f"获取评论时发生未知错误 for UID {uid}: {e}")
+def parse_user_replies(data: dict | None) -> List[Dict[str, Any]]:
+    replies = (data or {}).get('replies') or []
+    return [{'comment_text': reply.get('message')} for reply in replies if reply.get('message')]
+
+async def fetch_user_comments(
+    uid: int | str,
+    max_pages: int = USER_COMMENT_MAX_PAGES,
+) -> List[Dict[str, Any]] | None:
+    """
+    分页抓取用户评论，不读写 Redis：先取第一页拿到 all_count，再并发请求剩余页（不超过 max_pages）。
+    第一页请求失败时返回 None，用户确实没有评论时返回空列表
+    """
+    client = get_http_client()
+    semaphore = asyncio.Semaphore(USER_COMMENT_CONCURRENCY)
+
+    first = await fetch_user_comment_page(client, uid, 1, semaphore)
+    if first is None:
+        print(f"获取用户 {uid} 的评论失败")
+        return None
+    user_comments = parse_user_replies(first)
+    if not user_comments:
+        print(f"API返回空评论数据 for UID {uid}")
         return []
 
+    cursor = first.get('cursor') or {}
+    all_count = cursor.get('all_count') or 0
+    if cursor.get('is_end') or all_count <= USER_COMMENT_PAGE_SIZE:
+        total_pages = 1
+    else:
+        total_pages = min(max_pages, -(-all_count // USER_COMMENT_PAGE_SIZE))
+
+    tasks = [asyncio.create_task(fetch_user_comment_page(client, uid, page, semaphore))
+             for page in range(2, total_pages + 1)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            page_comments = parse_user_replies(await task)
+            if page_comments:
+                user_comments.extend(page_comments)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    print(f"成功获取 {len(user_comments)} 条评论 for UID {uid}（{total_pages} 页）")
+    return user_comments
+
+async def get_user_comments_async(
+    uid: int | str,
+    max_pages: int = USER_COMMENT_MAX_PAGES,
+) -> List[Dict[str, Any]] | None:
+    """
+    异步获取用户全部评论（分页逻辑见 fetch_user_comments）。
+    全部页面完成后一次性写入 Redis（key 为 uid），并通知向量 Worker 更新该用户的兴趣画像。
+    第一页请求失败时返回 None，用户确实没有评论时返回空列表。
+    """
+    print(f"开始获取用户 {uid} 的评论...")
+    user_comments = await fetch_user_comments(uid, max_pages)
+    if not user_comments:
+        return user_comments
+
+    await RedisClientAsync().set(str(uid), json.dumps(user_comments, ensure_ascii=False))
+    await video_recommendation.submit_profile_update(str(uid))
+    return user_comments
@@ -0,0 +1,41 @@
+import os
+import httpx
+
+# 接口根地址，压测时可指向本地 mock_server
+BILIBILI_API_BASE = os.getenv("BILIBILI_API_BASE", "https://api.bilibili.com")
+AICU_API_BASE = os.getenv("AICU_API_BASE", "https://api.aicu.cc")
+
+# 连接池配置，进程内所有 Bilibili 请求共用同一个长连接客户端
+HTTP_MAX_CONNECTIONS = int(os.getenv("BILIBILI_HTTP_MAX_CONNECTIONS", 32))
+HTTP_MAX_KEEPALIVE = int(os.getenv("BILIBILI_HTTP_MAX_KEEPALIVE", 16))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("BILIBILI_HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = float(os.getenv("BILIBILI_HTTP_TIMEOUT", 10))
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    获取进程内共享的 httpx.AsyncClient（带连接池和 keep-alive），首次调用时创建
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=HTTP_TIMEOUT,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    关闭共享客户端，释放连接池
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
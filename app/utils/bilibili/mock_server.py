@@ -0,0 +1,174 @@
+"""
+本地 B站 / aicu 接口替身，用于爬虫压测，避免访问真实服务。
+
+    python -m app.utils.bilibili.mock_server --port 5490 --latency-ms 80 --throttle-rate 0.01
+
+然后把 BILIBILI_API_BASE / AICU_API_BASE 指向 http://127.0.0.1:5490 即可。
+如果 --fixtures 目录下存在 reply_main.json / reply_reply.json / view.json / tags.json / aicu.json，
+对应接口会原样回放录制的响应，否则返回按参数确定性生成的合成数据。
+"""
+import argparse
+import asyncio
+import os
+import random
+import zlib
+from dataclasses import dataclass
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+import uvicorn
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = float(os.getenv("MOCK_LATENCY_MS", 50))
+    jitter_ms: float = float(os.getenv("MOCK_JITTER_MS", 20))
+    error_rate: float = float(os.getenv("MOCK_ERROR_RATE", 0))
+    throttle_rate: float = float(os.getenv("MOCK_THROTTLE_RATE", 0))
+    throttle_code: int = int(os.getenv("MOCK_THROTTLE_CODE", -412))
+    pages: int = int(os.getenv("MOCK_PAGES", 100))           # 每个视频的主评论页数
+    sub_replies: int = int(os.getenv("MOCK_SUB_REPLIES", 30))  # 每个主评论的回复数
+    user_comments: int = int(os.getenv("MOCK_USER_COMMENTS", 500))
+    seed: int = int(os.getenv("MOCK_SEED", 0))
+    fixtures: str = os.getenv("MOCK_FIXTURES", "")
+
+
+config = MockConfig()
+_rng = random.Random(config.seed)
+_fixtures: dict[str, bytes] = {}
+
+app = FastAPI(title="Bilibili Mock API")
+
+
+def load_fixtures(directory: str) -> None:
+    _fixtures.clear()
+    if not directory:
+        return
+    for name in ("reply_main", "reply_reply", "view", "tags", "aicu"):
+        path = os.path.join(directory, f"{name}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                _fixtures[name] = f.read()
+
+
+def _seeded(*parts) -> random.Random:
+    # 同样的参数总是生成同样的数据，保证压测可复现
+    return random.Random(zlib.crc32("|".join(map(str, (config.seed, *parts))).encode("utf-8")))
+
+
+async def _simulate(name: str) -> Response | None:
+    """
+    模拟网络延迟、服务端错误和风控，返回 None 表示正常继续
+    """
+    delay = max(0.0, config.latency_ms + _rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+    await asyncio.sleep(delay)
+    roll = _rng.random()
+    if roll < config.error_rate:
+        return JSONResponse(status_code=500, content={"code": -500, "message": "服务器错误"})
+    if roll < config.error_rate + config.throttle_rate:
+        return JSONResponse(status_code=200, content={"code": config.throttle_code, "message": "请求被拦截", "data": None})
+    if name in _fixtures:
+        return Response(content=_fixtures[name], media_type="application/json")
+    return None
+
+
+def _reply(rng: random.Random, rpid: int, parent: int, root: int, rcount: int = 0) -> dict:
+    return {
+        "rpid": rpid,
+        "ctime": 1700000000 + rng.randint(0, 10_000_000),
+        "parent": parent,
+        "root": root,
+        "like": rng.randint(0, 5000),
+        "rcount": rcount,
+        "member": {"uname": f"user_{rng.randint(1, 50000)}", "mid": str(rng.randint(1, 10**9))},
+        "content": {"message": "".join(rng.choice("这个视频真的很好看哈哈笑死我了学到了前排支持") for _ in range(rng.randint(4, 60)))},
+        "replies": None,
+    }
+
+
+@app.get("/x/v2/reply/main")
+async def reply_main(oid: str, next: int = 0, mode: int = 3, ps: int = 20):
+    if (resp := await _simulate("reply_main")) is not None:
+        return resp
+    replies = []
+    if next < config.pages:
+        rng = _seeded("main", oid, next, mode)
+        for i in range(ps):
+            rpid = (zlib.crc32(oid.encode()) % 10**6) * 10**6 + next * ps + i + 1
+            reply = _reply(rng, rpid, 0, 0, rcount=config.sub_replies)
+            reply["replies"] = [_reply(rng, rpid * 100 + j, rpid, rpid) for j in range(min(3, config.sub_replies))]
+            replies.append(reply)
+    return {"code": 0, "message": "0", "data": {"cursor": {"is_end": not replies, "next": next + 1}, "replies": replies}}
+
+
+@app.get("/x/v2/reply/reply")
+async def reply_reply(oid: str, root: int, pn: int = 1, ps: int = 20):
+    if (resp := await _simulate("reply_reply")) is not None:
+        return resp
+    rng = _seeded("sub", oid, root, pn)
+    start = (pn - 1) * ps
+    replies = [_reply(rng, root * 100 + j, root, root) for j in range(start, min(start + ps, config.sub_replies))]
+    return {"code": 0, "message": "0", "data": {"page": {"num": pn, "size": ps, "count": config.sub_replies}, "replies": replies}}
+
+
+@app.get("/x/web-interface/view")
+async def view(bvid: str):
+    if (resp := await _simulate("view")) is not None:
+        return resp
+    rng = _seeded("view", bvid)
+    return {"code": 0, "message": "0", "data": {
+        "bvid": bvid, "title": f"测试视频 {bvid}", "desc": "mock", "tname": rng.choice(["游戏", "知识", "生活", "音乐"]),
+        "pic": "", "pubdate": 1700000000, "duration": rng.randint(30, 3600), "owner": {"name": f"up_{rng.randint(1, 999)}"},
+        "stat": {k: rng.randint(0, 10**6) for k in ("view", "reply", "favorite", "coin")},
+    }}
+
+
+@app.get("/x/tag/archive/tags")
+async def tags(bvid: str):
+    if (resp := await _simulate("tags")) is not None:
+        return resp
+    rng = _seeded("tags", bvid)
+    pool = ["游戏", "原神", "教程", "科技", "数码", "美食", "日常", "音乐", "翻唱", "动画", "鬼畜", "知识", "编程", "Python"]
+    return {"code": 0, "message": "0", "data": [{"tag_id": i, "tag_name": name} for i, name in enumerate(rng.sample(pool, 5))]}
+
+
+@app.get("/api/v3/search/getreply")
+async def aicu_getreply(uid: str, pn: int = 1, ps: int = 100, mode: int = 0, keyword: str = ""):
+    if (resp := await _simulate("aicu")) is not None:
+        return resp
+    rng = _seeded("aicu", uid, pn)
+    start = (pn - 1) * ps
+    end = min(start + ps, config.user_comments)
+    replies = [{"rpid": start + i + 1, "message": _reply(rng, 0, 0, 0)["content"]["message"], "time": 1700000000 + i}
+               for i in range(max(0, end - start))]
+    return {"code": 0, "message": "", "data": {
+        "cursor": {"all_count": config.user_comments, "is_end": end >= config.user_comments}, "replies": replies}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 B站 / aicu 接口替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5490)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate)
+    parser.add_argument("--throttle-rate", type=float, default=config.throttle_rate)
+    parser.add_argument("--throttle-code", type=int, default=config.throttle_code)
+    parser.add_argument("--pages", type=int, default=config.pages)
+    parser.add_argument("--sub-replies", type=int, default=config.sub_replies)
+    parser.add_argument("--user-comments", type=int, default=config.user_comments)
+    parser.add_argument("--seed", type=int, default=config.seed)
+    parser.add_argument("--fixtures", default=config.fixtures, help="录制响应所在目录")
+    args = parser.parse_args()
+
+    for field in ("latency_ms", "jitter_ms", "error_rate", "throttle_rate", "throttle_code",
+                  "pages", "sub_replies", "user_comments", "seed", "fixtures"):
+        setattr(config, field, getattr(args, field))
+    _rng.seed(config.seed)
+    load_fixtures(config.fixtures)
+    uvicorn.run(app=app, host=args.host, port=args.port, log_level="warning")
+
+
+load_fixtures(config.fixtures)
+
+if __name__ == '__main__':
+    main()
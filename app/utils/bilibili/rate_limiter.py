@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+import httpx
+
+# B站风控返回码：-412 请求被拦截，-352 风控校验失败，-509 请求过于频繁
+THROTTLE_CODES = {-412, -352, -509}
+
+# 各接口初始速率（次/秒），可通过环境变量覆盖
+ENDPOINT_RATES = {
+    "reply": float(os.getenv("BILIBILI_RATE_REPLY", 4)),
+    "view": float(os.getenv("BILIBILI_RATE_VIEW", 4)),
+    "tag": float(os.getenv("BILIBILI_RATE_TAG", 4)),
+    "aicu": float(os.getenv("AICU_RATE", 2)),
+}
+DEFAULT_RATE = 2.0
+MIN_RATE = 0.2
+MAX_RATE = float(os.getenv("BILIBILI_RATE_MAX", 20))
+
+# AIMD 参数：每次成功加 INCREASE_STEP，被限流时乘以 DECREASE_FACTOR 并暂停 backoff 秒
+INCREASE_STEP = 0.05
+DECREASE_FACTOR = 0.5
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+# 被限流后，等令牌桶暂停结束再重试的次数；用尽后把最后一次的限流响应交给调用方
+THROTTLE_RETRIES = int(os.getenv("BILIBILI_THROTTLE_RETRIES", 2))
+
+_CODE_PATTERN = re.compile(rb'^\s*\{\s*"code"\s*:\s*(-?\d+)')
+
+
+class TokenBucket:
+    """
+    单个 (cookie, endpoint) 的令牌桶，速率按 AIMD 自适应调整
+    """
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = BACKOFF_BASE
+        # 最近一次被限流时的速率，接近它时放慢加速，避免在封禁阈值附近来回震荡
+        self.ceiling: float | None = None
+        # 最近一次降速的时刻；在它之前发出的请求属于同一个限流窗口，其结果不再调整速率
+        self.last_throttle = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self, issued_at: float | None = None) -> None:
+        if issued_at is not None and issued_at <= self.last_throttle:
+            return
+        step = INCREASE_STEP
+        if self.ceiling is not None and self.rate >= self.ceiling * 0.9:
+            step /= 10
+        self.rate = min(MAX_RATE, self.rate + step)
+        self.capacity = max(1.0, self.rate)
+        self.backoff = BACKOFF_BASE
+
+    def on_throttle(self, issued_at: float | None = None) -> bool:
+        """
+        降速并暂停。issued_at 为请求发出的时刻，早于上一次降速发出的请求（同一窗口内并发的其他请求）
+        被限流时不再重复降速，返回是否实际降速
+        """
+        if issued_at is not None and issued_at <= self.last_throttle:
+            return False
+        self.last_throttle = time.monotonic()
+        self.ceiling = self.rate
+        self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = 0
+        self.blocked_until = time.monotonic() + self.backoff
+        self.backoff = min(BACKOFF_MAX, self.backoff * 2)
+        return True
+
+
+class RateLimiter:
+    """
+    进程内共享的限流器，每个 cookie 和每个接口各有一个令牌桶
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "buckets"):
+            self.buckets: dict[tuple[str, str], TokenBucket] = {}
+
+    @staticmethod
+    def cookie_key(cookie: str | None) -> str:
+        # 只保存 cookie 的摘要，避免凭据出现在内存字典和日志里
+        if not cookie:
+            return "anonymous"
+        return hashlib.sha1(cookie.encode("utf-8")).hexdigest()[:12]
+
+    def get_bucket(self, cookie: str | None, endpoint: str) -> TokenBucket:
+        key = (self.cookie_key(cookie), endpoint)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(ENDPOINT_RATES.get(endpoint, DEFAULT_RATE))
+            self.buckets[key] = bucket
+        return bucket
+
+
+def is_throttled(response: httpx.Response) -> bool:
+    """
+    判断响应是否为风控限流：HTTP 412/429，或 JSON 顶层 code 属于 THROTTLE_CODES
+    """
+    if response.status_code in (412, 429):
+        return True
+    match = _CODE_PATTERN.match(response.content[:64])
+    return bool(match) and int(match.group(1)) in THROTTLE_CODES
+
+
+async def limited_get(client: httpx.AsyncClient, endpoint: str, url: str, headers: dict,
+                      retries: int = THROTTLE_RETRIES, **kwargs) -> httpx.Response:
+    """
+    经过限流器发送 GET 请求，并根据响应结果反馈给对应的令牌桶。
+    被限流时最多重试 retries 次，每次重试都先经过 acquire，即等到令牌桶的暂停结束
+    """
+    bucket = RateLimiter().get_bucket(headers.get("Cookie") or headers.get("cookie"), endpoint)
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        issued_at = time.monotonic()
+        response = await client.get(url, headers=headers, **kwargs)
+        if not is_throttled(response):
+            bucket.on_success(issued_at)
+            return response
+        if bucket.on_throttle(issued_at):
+            print(f"接口 {endpoint} 触发限流，速率降至 {bucket.rate:.2f}/s")
+        if attempt < retries:
+            print(f"接口 {endpoint} 被限流，第 {attempt + 1} 次重试")
+    return response
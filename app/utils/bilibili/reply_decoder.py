@@ -0,0 +1,106 @@
+import msgspec
+
+# 只声明需要保留的字段，其余字段在解码时直接跳过，不会构造中间 dict
+# gc=False：这些对象不会产生循环引用，关闭 GC 跟踪可以减少大批量解码时的开销
+
+
+class Member(msgspec.Struct, gc=False):
+    uname: str = ""
+
+
+class Content(msgspec.Struct, gc=False):
+    message: str = ""
+
+
+class SubReply(msgspec.Struct, gc=False):
+    rpid: int = 0
+    ctime: int = 0
+    parent: int = 0
+    root: int = 0
+    like: int = 0
+    member: Member = msgspec.field(default_factory=Member)
+    content: Content = msgspec.field(default_factory=Content)
+
+
+class Reply(SubReply, gc=False):
+    rcount: int = 0
+    replies: list[SubReply] | None = None
+
+
+class ReplyData(msgspec.Struct, gc=False):
+    replies: list[Reply] | None = None
+
+
+class ReplyPage(msgspec.Struct, gc=False):
+    code: int = -1
+    data: ReplyData | None = None
+
+
+class Cursor(msgspec.Struct, gc=False):
+    next: int = 0
+    is_end: bool = True
+
+
+class CursorData(msgspec.Struct, gc=False):
+    cursor: Cursor | None = None
+
+
+class CursorPage(msgspec.Struct, gc=False):
+    data: CursorData | None = None
+
+
+_decoder = msgspec.json.Decoder(ReplyPage)
+_cursor_decoder = msgspec.json.Decoder(CursorPage)
+
+DecodeError = msgspec.DecodeError
+
+
+def decode_reply_page(data_json: str | bytes) -> ReplyPage:
+    """
+    解码 reply/main、reply/reply 接口的响应，支持直接传入响应的原始 bytes
+    """
+    return _decoder.decode(data_json)
+
+
+def decode_cursor(data_json: str | bytes) -> tuple[int, bool]:
+    """
+    读取 reply/main 响应中的 data.cursor，返回 (next, is_end)；没有 cursor 时视为已到末尾
+    """
+    page = _cursor_decoder.decode(data_json)
+    cursor = page.data.cursor if page.data is not None else None
+    if cursor is None:
+        return 0, True
+    return cursor.next, cursor.is_end
+
+
+def decode_replies(comments: list, data_json: str | bytes) -> list:
+    """
+    与 json_load_2 输出相同结构的评论 dict，追加到 comments 中
+    """
+    page = decode_reply_page(data_json)
+    if page.code != 0 or page.data is None or not page.data.replies:
+        return comments
+    append = comments.append
+    for reply in page.data.replies:
+        append({
+            'user_name': reply.member.uname,
+            'comment_text': reply.content.message,
+            'bert_label': reply.like,
+            'rpid': reply.rpid,
+            'ctime': reply.ctime,
+            'parent': reply.parent,
+            'root': reply.root,
+            'rcount': reply.rcount
+        })
+        if reply.replies:
+            for sub_reply in reply.replies:
+                append({
+                    'user_name': sub_reply.member.uname,
+                    'comment_text': sub_reply.content.message,
+                    'bert_label': "待分析",
+                    'rpid': sub_reply.rpid,
+                    'ctime': sub_reply.ctime,
+                    'parent': sub_reply.parent,
+                    'root': sub_reply.root
+                })
+    return comments
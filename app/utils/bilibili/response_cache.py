@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+# 缓存文件放在本机磁盘上，同一台机器上的 API 进程和向量 Worker 共用
+CACHE_PATH = os.getenv(
+    "BILIBILI_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bilibili_nlp", "responses.sqlite3"),
+)
+
+# 各接口的 (ttl, stale_while_revalidate) 秒数：
+# ttl 内直接返回；超过 ttl 但在 swr 窗口内先返回旧值，同时后台刷新；再往后视为未命中
+ENDPOINT_TTLS = {
+    "view": (int(os.getenv("BILIBILI_CACHE_TTL_VIEW", 600)), int(os.getenv("BILIBILI_CACHE_SWR_VIEW", 3600))),
+    "tag": (int(os.getenv("BILIBILI_CACHE_TTL_TAG", 86400)), int(os.getenv("BILIBILI_CACHE_SWR_TAG", 7 * 86400))),
+}
+DEFAULT_TTL = (300, 600)
+PRUNE_EVERY = 500  # 每写入多少次清理一次彻底过期的记录
+
+
+class ResponseCache:
+    """
+    基于 SQLite 的本地响应缓存，按 (endpoint, key) 存储 JSON 结果，支持 stale-while-revalidate。
+    get / set 是同步的磁盘操作，get_or_fetch 通过 asyncio.to_thread 调用，不阻塞事件循环；
+    多个线程共用同一个连接，由锁串行化
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, path: str = CACHE_PATH):
+        if hasattr(self, "conn"):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        # WAL 允许多个进程同时读，写入不阻塞读
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "endpoint TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "PRIMARY KEY (endpoint, key))"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._refreshing: set[tuple[str, str]] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def get(self, endpoint: str, key: str) -> tuple[Any, float] | None:
+        """
+        返回 (value, age 秒)，不存在时返回 None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, stored_at FROM response_cache WHERE endpoint = ? AND key = ?", (endpoint, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def set(self, endpoint: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO response_cache (endpoint, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (endpoint, key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            for endpoint, (ttl, swr) in ENDPOINT_TTLS.items():
+                self.conn.execute(
+                    "DELETE FROM response_cache WHERE endpoint = ? AND stored_at < ?", (endpoint, now - ttl - swr)
+                )
+
+    async def get_or_fetch(self, endpoint: str, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        优先读缓存；fetcher 返回 None 表示请求失败，失败结果不会写入缓存
+        """
+        ttl, swr = ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+        cached = await asyncio.to_thread(self.get, endpoint, key)
+        if cached is not None:
+            value, age = cached
+            if age < ttl:
+                return value
+            if age < ttl + swr:
+                self._schedule_refresh(endpoint, key, fetcher)
+                return value
+
+        value = await fetcher()
+        if value is not None:
+            await asyncio.to_thread(self.set, endpoint, key, value)
+        return value
+
+    def _schedule_refresh(self, endpoint: str, key: str, fetcher: Callable[[], Awaitable[Any]]) -> None:
+        # 同一个 key 同时只保留一个后台刷新任务
+        if (endpoint, key) in self._refreshing:
+            return
+        self._refreshing.add((endpoint, key))
+
+        async def refresh():
+            try:
+                value = await fetcher()
+                if value is not None:
+                    await asyncio.to_thread(self.set, endpoint, key, value)
+            except Exception as e:
+                print(f"后台刷新缓存失败 {endpoint}:{key}: {e}")
+            finally:
+                self._refreshing.discard((endpoint, key))
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -1,28 +1,117 @@
 from app.database.redis_client_async import RedisClientAsync
+import asyncio
 import json
-import httpx
+import os
+import uuid
+from app.utils.bilibili.cookie_pool import CookiePool, CookiePoolExhausted, KIND_BILIBILI
+from app.utils.bilibili.response_cache import ResponseCache
+from app.utils.bilibili.http_client import BILIBILI_API_BASE, get_http_client
 redis = RedisClientAsync()
+cookie_pool = CookiePool(KIND_BILIBILI, fallback_key='cookie_video_info')
+response_cache = ResponseCache()
 
 VECTOR_INSRET = "streams_insert_bv"
 VECTOR_TUIJIAN = "streams_vector_tuijian"
 VECTOR_TUIJIAN_RESULT = "streams_vector_tuijian_RESULT"
+VECTOR_TUIJIAN_BATCH = "streams_vector_tuijian_batch"
+VECTOR_PROFILE_UPDATE = "streams_user_profile"
+# 已写入向量库的 BV 集合，由向量 Worker 在写入成功后维护
+INDEXED_BVS = "indexed_bvs"
+# 批量获取视频信息时同时在途的请求数
+VIDEO_INFO_CONCURRENCY = int(os.getenv("VIDEO_INFO_CONCURRENCY", 8))
+# 等待向量 Worker 应答的最长秒数
+TUIJIAN_TIMEOUT = int(os.getenv("TUIJIAN_TIMEOUT", 30))
 
-async def insert_vector_by_BV(BVid: str) -> None:
-    await redis.add_streams(VECTOR_INSRET, {"BV": BVid})
+def tuijian_reply_key(request_id: str) -> str:
+    return f"tuijian_reply:{request_id}"
 
-async def get_tuijian_bvs(user_id: str) -> list[str] | None:
-    await redis.add_streams(VECTOR_TUIJIAN, {"user_id": user_id})
-    while True:
-        data = await redis.get_streams(VECTOR_TUIJIAN_RESULT)
-        if redis.get_streams_dict(data)["user_id"] == user_id:
-            return json.loads(redis.get_streams_dict(data)["data"])
+async def insert_vector_by_BV(BVid: str, force: bool = False) -> bool:
+    """
+    提交入库请求，已入库的 BV 直接跳过并返回 False；force 为 True 时强制重新入库
+    """
+    if not force and await redis.sismember(INDEXED_BVS, BVid):
+        return False
+    fields = {"BV": BVid, "force": "1"} if force else {"BV": BVid}
+    await redis.add_streams(VECTOR_INSRET, fields)
+    return True
+
+async def get_tuijian_bvs(user_id: str, timeout: int = TUIJIAN_TIMEOUT) -> list[str] | None:
+    """
+    提交推荐请求并等待应答：每个请求有独立的应答 key，Worker 处理完 LPUSH 到该 key，
+    这里 BLPOP 等待，超时返回 None。并发请求之间互不干扰
+    """
+    request_id = uuid.uuid4().hex
+    reply_key = tuijian_reply_key(request_id)
+    if not await redis.add_streams(VECTOR_TUIJIAN, {"user_id": user_id, "request_id": request_id, "reply_key": reply_key}):
+        return None
+    reply = await redis.blpop(reply_key, timeout=timeout)
+    if reply is None:
+        print(f"等待用户 {user_id} 的推荐结果超时（{timeout}s）")
+        return None
+    return json.loads(reply)
+
+async def submit_profile_update(user_id: str) -> bool:
+    """
+    评论入库后通知向量 Worker 更新该用户的兴趣画像，推荐时直接读取画像
+    """
+    return await redis.add_streams(VECTOR_PROFILE_UPDATE, {"uid": user_id})
+
+
+async def submit_tuijian_batch(user_ids: list[str]) -> str | None:
+    """
+    提交批量推荐任务，由向量 Worker 分块计算并把结果写回各自的 {uid}_videos，返回 job_id；
+    进度写在 job_status:{job_id}
+    """
+    job_id = f"tuijian_batch_{uuid.uuid4().hex[:8]}"
+    await redis.set_job_status(job_id, {"status": "Pending", "total": len(user_ids), "done": 0, "empty": 0, "failed": 0})
+    if not await redis.add_streams(VECTOR_TUIJIAN_BATCH, {"job_id": job_id, "uids": json.dumps(user_ids)}):
+        return None
+    return job_id
 
 
 async def get_video_info(BVid: str) -> dict:
-    cookie = await redis.get('cookie_video_info')
-    url = f"https://api.bilibili.com/x/web-interface/view?bvid={BVid}"
-    headers = {
-        'Cookie': cookie,
+    """
+    获取视频信息，命中本地响应缓存时不再请求B站
+    """
+    video_info = await response_cache.get_or_fetch("view", BVid, lambda: fetch_video_info(BVid))
+    return video_info if video_info is not None else {'msg': 'fail'}
+
+
+async def get_video_infos(BVids: list[str]) -> dict[str, dict]:
+    """
+    批量获取视频信息：缓存命中的直接返回，未命中的通过共享连接池并发请求，
+    每个请求各自从 cookie 池轮换取账号。获取失败（包括抛出异常）的 BV 与 get_video_info 一样返回 {'msg': 'fail'}，
+    不影响其他 BV；只有 cookie 池等待超时会向上抛出，由接口返回 503
+    """
+    BVids = list(dict.fromkeys(BVids))
+    semaphore = asyncio.Semaphore(VIDEO_INFO_CONCURRENCY)
+
+    async def fetch(BVid: str) -> dict | None:
+        async with semaphore:
+            return await fetch_video_info(BVid)
+
+    async def one(BVid: str) -> dict | None:
+        return await response_cache.get_or_fetch("view", BVid, lambda: fetch(BVid))
+
+    infos = await asyncio.gather(*(one(BVid) for BVid in BVids), return_exceptions=True)
+    results = {}
+    for BVid, info in zip(BVids, infos):
+        if isinstance(info, CookiePoolExhausted):
+            raise info
+        if isinstance(info, Exception):
+            print(f"获取视频 {BVid} 信息失败: {info}")
+            info = None
+        results[BVid] = info if info is not None else {'msg': 'fail'}
+    return results
+
+
+async def fetch_video_info(BVid: str) -> dict | None:
+    """
+    请求B站 view 接口，每次从 cookie 池轮换取一个账号；失败时返回 None（不写入缓存）
+    """
+    url = f"{BILIBILI_API_BASE}/x/web-interface/view?bvid={BVid}"
+    headers = lambda cookie: {
+        'Cookie': cookie or '',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
         'Accept-Encoding': 'gzip, deflate, br, zstd',
@@ -35,14 +124,22 @@ async def get_video_info(BVid: str) -> dict:
         'Sec-Fetch-User': '?1',
         'Priority': 'u=0, i'
     }
-    async with httpx.AsyncClient() as requests:
-        response = await requests.get(url, headers=headers)
+    response = await cookie_pool.fetch(get_http_client(), "view", url, headers)
+    if response is None:
+        return None
     print(f"API响应状态码: {response.status_code}")
     print(f"API响应内容: {response.text[:200]}...")  # 只打印前200字符避免过长
     
     if response.status_code == 200:
-        data = response.json()
-        if data.get('code') == 0:  # B站API成功返回code=0
+        try:
+            data = response.json()
+        except ValueError:
+            print(f"视频 {BVid} 的响应不是合法的 JSON")
+            return None
+        if not isinstance(data, dict):
+            print(f"视频 {BVid} 的响应格式异常: {type(data).__name__}")
+            return None
+        if data.get('code') == 0 and isinstance(data.get('data'), dict):  # B站API成功返回code=0
             video_data = data['data']
             return {
                 'msg': 'OK',
@@ -60,9 +157,9 @@ async def get_video_info(BVid: str) -> dict:
             }
         else:
             print(f"B站API返回错误: {data.get('message', '未知错误')}")
-            return {'msg': 'fail'}
+            return None
     else:
         print(f"HTTP请求失败，状态码: {response.status_code}")
-        return {'msg': 'fail'}
+        return None
     
         
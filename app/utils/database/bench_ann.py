@@ -0,0 +1,148 @@
+"""
+ANN 索引压测：在给定的向量文件上比较各索引方案的 recall@k 与单次检索 p50/p99 延迟。
+
+    # vectors.npy 为 (N, dim) 的 float32 矩阵；不指定 --queries 时从中留出一部分作为查询
+    python -m app.utils.database.bench_ann --vectors vectors.npy --profiles ivf_flat,ivf_sq8,hnsw --k 10
+    # 不依赖 Milvus，测试进程内 LocalVectorStore 的 IVF
+    python -m app.utils.database.bench_ann --synthetic 50000 --backend local --nprobe 4,8,16
+
+召回率以 NumPy 精确检索为基准。
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import numpy as np
+from app.database.index_profiles import INDEX_PROFILES, MILVUS_URI, index_params, milvus_search_params, search_params
+from app.database.local_vector_store import LocalVectorStore, normalize, top_k_indices
+
+INSERT_CHUNK = 5000
+
+
+def percentile_ms(latencies: list[float], p: float) -> float:
+    return float(np.percentile(latencies, p) * 1000) if latencies else 0.0
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    scores = normalize(queries) @ normalize(vectors).T
+    return [set(top_k_indices(row, k).tolist()) for row in scores]
+
+
+def recall_at_k(found: list[list[int]], truth: list[set[int]]) -> float:
+    return float(np.mean([len(set(f) & t) / len(t) for f, t in zip(found, truth)]))
+
+
+def load_data(args) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        # 合成数据：若干簇中心加噪声，比纯随机向量更接近真实嵌入的分布
+        centers = rng.normal(size=(max(1, args.synthetic // 100), args.dim))
+        vectors = centers[rng.integers(0, len(centers), args.synthetic)] + 0.3 * rng.normal(size=(args.synthetic, args.dim))
+        vectors = vectors.astype(np.float32)
+    if args.queries:
+        return vectors, np.load(args.queries).astype(np.float32)
+    order = rng.permutation(len(vectors))
+    return vectors[order[args.num_queries:]], vectors[order[:args.num_queries]]
+
+
+def bench_milvus(args, vectors: np.ndarray, queries: np.ndarray, truth: list[set[int]]) -> list[dict]:
+    from pymilvus import DataType, MilvusClient as SyncMilvusClient
+
+    client = SyncMilvusClient(uri=args.uri)
+    rows = []
+    for profile in args.profiles.split(","):
+        collection = f"ann_bench_{profile}"
+        if client.has_collection(collection):
+            client.drop_collection(collection)
+        schema = SyncMilvusClient.create_schema(auto_id=False)
+        schema.add_field("row_id", DataType.INT64, is_primary=True)
+        schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=vectors.shape[1])
+        client.create_collection(collection, schema=schema)
+        try:
+            for start in range(0, len(vectors), INSERT_CHUNK):
+                chunk = vectors[start:start + INSERT_CHUNK]
+                client.insert(collection, [{"row_id": start + i, "embedding": v.tolist()} for i, v in enumerate(chunk)])
+            client.flush(collection)
+
+            build_start = time.perf_counter()
+            params = client.prepare_index_params()
+            spec = index_params(profile)
+            params.add_index(field_name="embedding", index_type=spec["index_type"],
+                             metric_type=spec["metric_type"], params=spec["params"])
+            client.create_index(collection, params)
+            client.load_collection(collection)
+            build_s = time.perf_counter() - build_start
+
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = client.search(collection, data=[query.tolist()], anns_field="embedding", limit=args.k,
+                                     search_params=milvus_search_params(profile))
+                latencies.append(time.perf_counter() - start)
+                found.append([hit["id"] for hit in hits[0]])
+            rows.append({"profile": profile, "params": search_params(profile), "build_s": build_s,
+                         "recall": recall_at_k(found, truth), "p50_ms": percentile_ms(latencies, 50),
+                         "p99_ms": percentile_ms(latencies, 99)})
+        finally:
+            if not args.keep:
+                client.drop_collection(collection)
+    return rows
+
+
+def bench_local(args, vectors: np.ndarray, queries: np.ndarray, truth: list[set[int]]) -> list[dict]:
+    rows = []
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path, dim=vectors.shape[1], dtype=args.dtype)
+        asyncio.run(store.insert_vector([str(i) for i in range(len(vectors))], vectors.tolist()))
+        configs = [("exact", None)]
+        build_s = 0.0
+        if args.nprobe:
+            start = time.perf_counter()
+            store.build_ivf()
+            build_s = time.perf_counter() - start
+            configs += [("ivf", int(n)) for n in args.nprobe.split(",")]
+        for name, nprobe in configs:
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = store.search_batch([query.tolist()], top_k=args.k, nprobe=nprobe or 0, exact=nprobe is None)[0]
+                latencies.append(time.perf_counter() - start)
+                found.append([int(vid) for vid, _ in hits])
+            rows.append({"profile": f"local_{name}", "params": {"nprobe": nprobe} if nprobe else {},
+                         "build_s": build_s if nprobe else 0.0, "recall": recall_at_k(found, truth),
+                         "p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99)})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ANN 索引方案的召回率 / 延迟压测")
+    parser.add_argument("--vectors", default="", help="(N, dim) 的 .npy 向量文件")
+    parser.add_argument("--queries", default="", help="查询向量 .npy，留空则从 --vectors 中留出")
+    parser.add_argument("--synthetic", type=int, default=20000, help="未指定 --vectors 时生成的向量数")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backend", choices=["milvus", "local"], default="milvus")
+    parser.add_argument("--profiles", default=",".join(INDEX_PROFILES))
+    parser.add_argument("--uri", default=MILVUS_URI)
+    parser.add_argument("--keep", action="store_true", help="保留压测集合")
+    parser.add_argument("--nprobe", default="4,8,16", help="local 后端要测试的 nprobe 列表，留空只测精确检索")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors, queries = load_data(args)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"向量 {vectors.shape}, 查询 {len(queries)}, k={args.k}")
+
+    rows = bench_milvus(args, vectors, queries, truth) if args.backend == "milvus" else bench_local(args, vectors, queries, truth)
+    print(f"{'profile':<14}{'search params':<24}{'build_s':>9}{'recall@k':>10}{'p50_ms':>9}{'p99_ms':>9}")
+    for row in rows:
+        print(f"{row['profile']:<14}{str(row['params']):<24}{row['build_s']:>9.2f}"
+              f"{row['recall']:>10.4f}{row['p50_ms']:>9.3f}{row['p99_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,70 +1,87 @@
-from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType
+"""
+创建 / 重建推荐用的 Milvus 集合，并按选定的索引方案建索引。
 
-async def create_milvus_collection(collection_name="video_recommend"):
+    python -m app.utils.database.millvus_setup --collection video_recommend --index-profile hnsw
+
+pymilvus 的 ORM 接口（connections / Collection / utility）均为同步调用，这里不使用 asyncio。
+"""
+import argparse
+from pymilvus import connections, utility, Collection, FieldSchema, CollectionSchema, DataType
+from app.database.index_profiles import INDEX_PROFILES, MILVUS_URI, index_params as get_index_params, profile_name_for
+
+def create_milvus_collection(collection_name="video_recommend", index_profile: str | None = None,
+                             uri: str = MILVUS_URI) -> bool:
     """
-    创建Milvus集合，定义正确的模式
+    创建Milvus集合，定义正确的模式；index_profile 为 index_profiles 中的方案名，默认按集合名从环境变量选择
     """
     try:
         # 连接到Milvus
-        connections.connect("default", host="127.0.0.1", port="19530")
-        
+        connections.connect("default", uri=uri)
+
         # 定义字段
         fields = [
-            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-            FieldSchema(name="video_id", dtype=DataType.VARCHAR, max_length=128),
+            # 以 video_id 为主键，重复写入同一视频时 upsert 覆盖而不是新增一行
+            FieldSchema(name="video_id", dtype=DataType.VARCHAR, max_length=128, is_primary=True, auto_id=False),
             FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=768)  # BGE-base模型输出768维向量
         ]
-        
+
         # 创建集合模式
         schema = CollectionSchema(fields, description="Video recommendation collection")
-        
+
         # 创建集合
         collection = Collection(name=collection_name, schema=schema)
-        
+
         # 创建索引
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "metric_type": "COSINE",
-            "params": {"nlist": 1024}
-        }
-        
-        await collection.create_index(field_name="embedding", index_params=index_params)
-        
-        print(f"集合 {collection_name} 创建成功")
+        index_params = get_index_params(index_profile or profile_name_for(collection_name))
+
+        collection.create_index(field_name="embedding", index_params=index_params)
+
+        print(f"集合 {collection_name} 创建成功，索引: {index_params['index_type']} {index_params['params']}")
         return True
-        
+
     except Exception as e:
         print(f"创建集合失败: {e}")
         return False
     finally:
         connections.disconnect("default")
 
-async def recreate_collection_with_correct_schema(collection_name="video_recommend"):
+def recreate_collection_with_correct_schema(collection_name="video_recommend", index_profile: str | None = None,
+                                            uri: str = MILVUS_URI) -> bool:
     """
     删除现有集合并创建具有正确模式的新集合
     """
     try:
-        connections.connect("default", host="127.0.0.1", port="19530")
-        
+        connections.connect("default", uri=uri)
+
         # 尝试删除现有集合（如果存在）
-        from pymilvus import utility
         if utility.has_collection(collection_name):
             print(f"删除现有集合 {collection_name}")
-            await utility.drop_collection(collection_name)
-        
-        # 创建新集合
-        return create_milvus_collection(collection_name)
-        
+            utility.drop_collection(collection_name)
+
     except Exception as e:
         print(f"重新创建集合失败: {e}")
         return False
     finally:
         connections.disconnect("default")
 
-if __name__ == "__main__":
+    # 创建新集合
+    return create_milvus_collection(collection_name, index_profile, uri)
+
+def main():
+    parser = argparse.ArgumentParser(description="重建推荐用的 Milvus 集合")
+    parser.add_argument("--collection", default="video_recommend")
+    parser.add_argument("--index-profile", default=None, choices=list(INDEX_PROFILES),
+                        help="索引方案，默认按集合名从 MILVUS_INDEX_PROFILE* 环境变量选择")
+    parser.add_argument("--uri", default=MILVUS_URI)
+    args = parser.parse_args()
+
     # 创建正确的集合
-    success = recreate_collection_with_correct_schema()
+    success = recreate_collection_with_correct_schema(args.collection, args.index_profile, args.uri)
     if success:
         print("Milvus集合创建成功")
     else:
         print("Milvus集合创建失败")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
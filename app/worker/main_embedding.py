@@ -0,0 +1,160 @@
+"""
+本机向量服务：进程内只加载一份模型，通过 Unix socket 或 localhost TCP 为各 Worker 提供编码。
+来自不同连接、不同调用方的请求在 EMBEDDING_SERVER_MAX_WAIT 内合并为一批（最多
+EMBEDDING_SERVER_MAX_BATCH 条文本）送入模型，编码在线程中执行，不阻塞接收新请求。
+
+    python -m app.worker.main_embedding --address unix:/tmp/bilibili_nlp_embedding.sock
+    # Worker 侧设置 EMBEDDING_SERVER=unix:/tmp/bilibili_nlp_embedding.sock 即改为调用该服务
+"""
+import argparse
+import asyncio
+import os
+import numpy as np
+from app.worker.utils.embedding_backend import get_embedding_backend, EMBEDDING_BACKEND
+from app.worker.utils.embedding_client import (
+    DEFAULT_EMBEDDING_SERVER, EMBEDDING_SERVER, parse_address, read_frame, write_frame,
+)
+
+# 一批最多合并的文本数，以及凑批的最长等待时间（秒）
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", 64))
+EMBEDDING_SERVER_MAX_WAIT = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT", 0.005))
+ENCODE_BATCH_SIZE = int(os.getenv("VECTOR_ENCODE_BATCH_SIZE", 32))
+
+
+class MicroBatcher:
+    """
+    动态微批：第一个请求到达后最多再等 max_wait 秒收集其他请求，凑满 max_batch 条文本立即执行。
+    超过 max_batch 的请求拆成若干片依次入队，结果按原顺序拼回，单批大小始终不超过 max_batch
+    """
+    def __init__(self, model, max_batch: int = EMBEDDING_SERVER_MAX_BATCH,
+                 max_wait: float = EMBEDDING_SERVER_MAX_WAIT, batch_size: int = ENCODE_BATCH_SIZE):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue[tuple[list[str], asyncio.Future]] = asyncio.Queue()
+        self._held: tuple[list[str], asyncio.Future] | None = None
+        self.batches = 0
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for start in range(0, max(len(texts), 1), self.max_batch):
+            future = loop.create_future()
+            await self.queue.put((texts[start:start + self.max_batch], future))
+            futures.append(future)
+        if len(futures) == 1:
+            return await futures[0]
+        return np.concatenate(await asyncio.gather(*futures))
+
+    async def _collect(self) -> list[tuple[list[str], asyncio.Future]]:
+        first = self._held or await self.queue.get()
+        self._held = None
+        batch, size = [first], len(first[0])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - loop.time()
+            try:
+                item = self.queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(self.queue.get(), remaining)
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if size + len(item[0]) > self.max_batch:
+                # 放到下一批的开头，保持先来先服务
+                self._held = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def run(self) -> None:
+        while True:
+            batch = await self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await asyncio.to_thread(self.model.encode, texts, batch_size=self.batch_size)
+                vectors = np.asarray(vectors, dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+class EmbeddingServer:
+    def __init__(self, model, batcher: MicroBatcher | None = None):
+        self.model = model
+        self.batcher = batcher or MicroBatcher(model)
+        self.dim: int | None = None
+
+    async def handle_request(self, message: dict, writer: asyncio.StreamWriter) -> None:
+        request_id = message.get("id")
+        try:
+            if message.get("op") == "info":
+                if self.dim is None:
+                    self.dim = int((await self.batcher.encode(["维度探测"])).shape[1])
+                reply = {"id": request_id, "model_id": self.model.model_id, "dim": self.dim}
+            elif message.get("op") == "encode":
+                vectors = await self.batcher.encode([str(t) for t in message.get("texts", [])])
+                reply = {"id": request_id, "dim": int(vectors.shape[1]), "vectors": vectors.tobytes()}
+            else:
+                reply = {"id": request_id, "error": f"未知操作: {message.get('op')}"}
+        except Exception as e:
+            reply = {"id": request_id, "error": str(e)}
+        if not writer.is_closing():
+            write_frame(writer, reply)
+            await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # 同一连接上的请求并发处理，应答通过 id 对应
+        tasks = set()
+        try:
+            while True:
+                message = await read_frame(reader)
+                task = asyncio.create_task(self.handle_request(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"向量服务连接异常: {e}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def start(self, address: str) -> asyncio.AbstractServer:
+        kind, target = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target): # type: ignore
+                os.unlink(target) # type: ignore
+            return await asyncio.start_unix_server(self.handle_connection, path=target) # type: ignore
+        host, port = target # type: ignore
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def run(address: str, backend: str) -> None:
+    model = await asyncio.to_thread(get_embedding_backend, backend)
+    server = EmbeddingServer(model)
+    batch_task = asyncio.create_task(server.batcher.run())
+    async with await server.start(address) as listener:
+        print(f"向量服务已启动: {address}，模型 {model.model_id}")
+        await asyncio.gather(listener.serve_forever(), batch_task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本机共享的文本向量服务")
+    parser.add_argument("--address", default=EMBEDDING_SERVER or DEFAULT_EMBEDDING_SERVER,
+                        help="unix:/path 或 tcp:127.0.0.1:port")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, choices=["torch", "onnx"])
+    args = parser.parse_args()
+    asyncio.run(run(args.address, args.backend))
+
+if __name__ == '__main__':
+    main()
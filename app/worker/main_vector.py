@@ -1,76 +1,423 @@
 import json
-from sentence_transformers import SentenceTransformer
 from app.database.milvus_client import MilvusClient
+from app.database.vector_store import get_vector_store
 from app.database.redis_client_async import RedisClientAsync
-import httpx
+from app.utils.bilibili.cookie_pool import CookiePool, KIND_BILIBILI
+from app.utils.bilibili.response_cache import ResponseCache
+from app.utils.bilibili.http_client import BILIBILI_API_BASE, get_http_client
+from app.worker.utils.embedding_cache import EmbeddingCache
+from app.worker.utils.embedding_backend import get_embedding_backend
+from app.worker.utils.embedding_client import EmbeddingClient, EMBEDDING_SERVER, EMBEDDING_CONNECT_WAIT
+from app.worker.utils.user_profile import UserProfileStore, merge_with_quotas
+from app.worker.utils.tag_index import TagIndex, VIDEO_TAGS_KEY, query_terms_from_counts, rrf_fuse
 from httpx import AsyncClient
 import asyncio
+import os
+import time
 
-model = SentenceTransformer("BAAI/bge-base-zh")  # 768维
+# 模型在 run() 中按需加载：设置了 EMBEDDING_SERVER 时连接本机向量服务，
+# 否则由 EMBEDDING_BACKEND 选择 torch 或 onnx-int8 后端在进程内加载，输出均为 768 维归一化向量
+model = None
+embedding_cache: EmbeddingCache = None # type: ignore
+profile_store: UserProfileStore = None # type: ignore
+tag_index = TagIndex()
 
 VECTOR_INSRET = "streams_insert_bv"
 VECTOR_TUIJIAN = "streams_vector_tuijian"
 VECTOR_TUIJIAN_RESULT = "streams_vector_tuijian_RESULT"
+VECTOR_TUIJIAN_BATCH = "streams_vector_tuijian_batch"
+VECTOR_PROFILE_UPDATE = "streams_user_profile"
+INDEXED_BVS = "indexed_bvs"
 
+# 入库批处理：一次最多合并多少个 BV，以及凑批的最长等待时间（秒）
+INSERT_BATCH_SIZE = int(os.getenv("VECTOR_INSERT_BATCH_SIZE", 64))
+INSERT_BATCH_WINDOW = float(os.getenv("VECTOR_INSERT_BATCH_WINDOW", 0.5))
+ENCODE_BATCH_SIZE = int(os.getenv("VECTOR_ENCODE_BATCH_SIZE", 32))
+# 取标签阶段：同时在途的标签请求数，以及已取好标签、等待编码的批次数上限
+TAG_FETCH_CONCURRENCY = int(os.getenv("TAG_FETCH_CONCURRENCY", 8))
+TAG_QUEUE_SIZE = int(os.getenv("TAG_QUEUE_SIZE", 2))
+# 一次最多读取的推荐请求数，以及应答 key 的过期时间
+TUIJIAN_BATCH_SIZE = int(os.getenv("TUIJIAN_BATCH_SIZE", 16))
+TUIJIAN_REPLY_TTL = 60
+# 每次推荐返回的视频数；多兴趣召回时每个兴趣中心多取一些，以便去重后仍能填满
+TUIJIAN_TOP_K = int(os.getenv("TUIJIAN_TOP_K", 5))
+TUIJIAN_OVERFETCH = 2
+# 混合召回：标签 BM25 与向量检索各取若干候选，再用 RRF 融合
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_DENSE_K = int(os.getenv("HYBRID_DENSE_K", 10))
+HYBRID_SPARSE_K = int(os.getenv("HYBRID_SPARSE_K", 20))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", 1.0))
+HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", 1.0))
+# 批量推荐任务：每轮处理的用户数，以及一次 ANN 请求最多携带的查询向量数
+TUIJIAN_JOB_CHUNK = int(os.getenv("TUIJIAN_JOB_CHUNK", 256))
+TUIJIAN_SEARCH_CHUNK = int(os.getenv("TUIJIAN_SEARCH_CHUNK", 64))
+TUIJIAN_JOB_TTL = 3600
+# 一次最多合并处理的画像更新请求数
+PROFILE_UPDATE_BATCH = int(os.getenv("PROFILE_UPDATE_BATCH", 64))
+# 读取消息流出错（如 Redis 断连）后，等待多少秒再重试
+WORKER_RETRY_DELAY = 2
 
-async def insert_vector_by_BV(BVid: str, client: AsyncClient, redis: RedisClientAsync, milvus: MilvusClient) -> None:
-    tags = await get_video_tags(BVid, client, redis)
-    tags_str = " ".join(tags)
-    embeddings = model.encode(tags_str).tolist()
-    await milvus.insert_vector([BVid], [embeddings])
+cookie_pool = CookiePool(KIND_BILIBILI, fallback_key='cookie_video_info')
+response_cache = ResponseCache()
+
+
+async def save_video_tags(tags_by_bv: dict[str, list[str]], redis: RedisClientAsync) -> None:
+    """
+    标签写入 Redis 哈希并加入本进程的 BM25 索引，供混合召回使用
+    """
+    await tag_index.save(tags_by_bv, redis.redis_client)
+
+async def filter_unindexed(BVids: list[str], redis: RedisClientAsync, forced: set[str] | None = None) -> list[str]:
+    """
+    用 SMISMEMBER 一次性过滤掉已入库的 BV，forced 中的 BV 始终保留
+    """
+    forced = forced or set()
+    indexed = await redis.smismember(INDEXED_BVS, BVids)
+    return [BVid for BVid, done in zip(BVids, indexed) if BVid in forced or not done]
+
+async def encode_and_insert(tags_by_bv: dict[str, list[str]], redis: RedisClientAsync, milvus: MilvusClient) -> None:
+    """
+    一次 encode 全部标签文本，再一次性 upsert 到向量库
+    """
+    if not tags_by_bv:
+        return
+    BVids = list(tags_by_bv)
+    tags_strs = [" ".join(tags) for tags in tags_by_bv.values()]
+    embeddings = (await embedding_cache.encode_cached(model, tags_strs, batch_size=ENCODE_BATCH_SIZE)).tolist()
+    await milvus.insert_vector(BVids, embeddings)
+    await save_video_tags(tags_by_bv, redis)
+    await redis.sadd(INDEXED_BVS, *BVids)
+    print(f"批量写入 {len(BVids)} 个视频向量")
+
+async def read_insert_batch(redis: RedisClientAsync, last_id: str) -> tuple[list[str], set[str], str]:
+    """
+    阻塞等待第一条入库消息，之后在 INSERT_BATCH_WINDOW 内继续收集，最多 INSERT_BATCH_SIZE 条。
+    返回去重后的 BV 列表、要求强制重建的 BV 集合和最后一条消息 id
+    """
+    entries = await redis.read_streams(VECTOR_INSRET, last_id, count=INSERT_BATCH_SIZE, block=0)
+    deadline = time.monotonic() + INSERT_BATCH_WINDOW
+    while len(entries) < INSERT_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        more = await redis.read_streams(VECTOR_INSRET, entries[-1][0],
+                                        count=INSERT_BATCH_SIZE - len(entries), block=max(1, int(remaining * 1000)))
+        if not more:
+            break
+        entries.extend(more)
+    BVids = list(dict.fromkeys(fields["BV"] for _, fields in entries if fields.get("BV")))
+    forced = {fields["BV"] for _, fields in entries if fields.get("BV") and fields.get("force") == "1"}
+    return BVids, forced, entries[-1][0]
 
 async def get_tuijian_bvs(user_id: str, redis: RedisClientAsync, milvus: MilvusClient) -> list[str] | None:
-    raw = await redis.get(user_id)  # bytes
-    if not raw:
-        return None
-    comments = json.loads(raw)
-    all_text = " ".join(comment["comment_text"] for comment in comments)
-    results = await milvus.search_similar(model.encode(all_text).tolist())
+    """
+    单个用户的推荐，与批量任务共用 get_tuijian_bvs_batch
+    """
+    return (await get_tuijian_bvs_batch([user_id], redis, milvus))[user_id]
+
+async def load_user_texts(user_ids: list[str], redis: RedisClientAsync) -> dict[str, list[str]]:
+    """
+    一次 pipeline 读取多个用户已抓取的评论文本（key 为 uid）
+    """
+    pipe = redis.redis_client.pipeline()
+    for user_id in user_ids:
+        pipe.get(user_id)
+    texts_by_uid = {}
+    for user_id, raw in zip(user_ids, await pipe.execute()):
+        comments = json.loads(raw) if raw else []
+        texts_by_uid[user_id] = [comment["comment_text"] for comment in comments if comment.get("comment_text")]
+    return texts_by_uid
+
+async def update_profiles(user_ids: list[str], redis: RedisClientAsync) -> dict[str, dict]:
+    """
+    用已抓取的评论更新画像，只编码新出现的评论
+    """
+    texts_by_uid = await load_user_texts(user_ids, redis)
+    return await profile_store.update_many(texts_by_uid, model, batch_size=ENCODE_BATCH_SIZE)
+
+async def get_tuijian_bvs_batch(user_ids: list[str], redis: RedisClientAsync, milvus: MilvusClient) -> dict[str, list[str] | None]:
+    """
+    批量推荐：画像已在评论入库时更新，这里一次 pipeline 读取所有用户的画像，
+    所有用户的兴趣中心按 TUIJIAN_SEARCH_CHUNK 分块做批量 ANN 检索，再按各中心的权重分配名额合并；
+    标签召回直接使用画像中的高频词。
+    还没有画像的用户才回退为读取评论并更新画像。没有评论的用户结果为 None
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    profiles = await profile_store.load_many(user_ids)
+    stale = [user_id for user_id, profile in profiles.items() if profile["mean"] is None]
+    if stale:
+        texts_by_uid = await load_user_texts(stale, redis)
+        profiles.update(await profile_store.update_many(texts_by_uid, model, batch_size=ENCODE_BATCH_SIZE))
+
+    limit = HYBRID_DENSE_K if HYBRID_RETRIEVAL else TUIJIAN_TOP_K
+    dense = await get_dense_candidates_batch(profiles, milvus, limit)
+    if not HYBRID_RETRIEVAL:
+        return {user_id: dense.get(user_id) for user_id in user_ids}
+
+    await tag_index.refresh(redis.redis_client)
+    results = {}
+    for user_id in user_ids:
+        if user_id not in dense:
+            results[user_id] = None
+            continue
+        terms = query_terms_from_counts(profiles[user_id]["terms"])
+        sparse = [vid for vid, _ in tag_index.search(terms, HYBRID_SPARSE_K)]
+        results[user_id] = rrf_fuse([dense[user_id], sparse], [HYBRID_DENSE_WEIGHT, HYBRID_SPARSE_WEIGHT], TUIJIAN_TOP_K)
     return results
 
+async def get_dense_candidates_batch(profiles: dict[str, dict], milvus: MilvusClient, limit: int) -> dict[str, list[str]]:
+    """
+    向量召回：只有一个兴趣中心的用户用画像向量检索，否则用所有兴趣中心；
+    所有用户的查询向量拼在一起分块批量检索，多中心用户的结果按名额合并
+    """
+    queries, owners, weights = [], [], {}
+    for user_id, profile in profiles.items():
+        if profile["mean"] is None:
+            continue
+        centroids, counts = profile["centroids"], profile["counts"]
+        if centroids is None or len(centroids) < 2:
+            queries.append(profile["mean"].tolist())
+            owners.append(user_id)
+            continue
+        weights[user_id] = counts.tolist()
+        queries.extend(centroids.tolist())
+        owners.extend([user_id] * len(centroids))
+
+    hits = []
+    for start in range(0, len(queries), TUIJIAN_SEARCH_CHUNK):
+        hits.extend(await milvus.search_similar_batch(queries[start:start + TUIJIAN_SEARCH_CHUNK],
+                                                      top_k=limit * TUIJIAN_OVERFETCH))
+    grouped: dict[str, list[list[str]]] = {}
+    for user_id, result in zip(owners, hits):
+        grouped.setdefault(user_id, []).append(result)
+    return {
+        user_id: merge_with_quotas(results, weights[user_id], limit) if user_id in weights else results[0][:limit]
+        for user_id, results in grouped.items()
+    }
+
     
-async def get_video_tags(BVid: str, client: AsyncClient, redis: RedisClientAsync) -> list[str]:
-    cookie = await redis.get('cookie_video_info') 
-    headers = {
+async def get_video_tags(BVid: str, client: AsyncClient) -> list[str]:
+    tags = await response_cache.get_or_fetch("tag", BVid, lambda: fetch_video_tags(BVid, client))
+    return tags if tags is not None else ['error']
+
+async def get_video_tags_batch(BVids: list[str], client: AsyncClient, redis: RedisClientAsync) -> dict[str, list[str]]:
+    """
+    批量取标签：先用 HMGET 查 video_tags 哈希（重建向量时无需再请求B站），
+    其余的经本地响应缓存和共享连接池并发请求，最多 TAG_FETCH_CONCURRENCY 个在途；
+    每个请求各自从 cookie 池轮换取账号，分摊到各账号的令牌桶。
+    取标签失败的 BV 不在返回结果中
+    """
+    cached = await redis.redis_client.hmget(VIDEO_TAGS_KEY, BVids) # type: ignore
+    tags_by_bv = {}
+    for BVid, raw in zip(BVids, cached):
+        try:
+            if raw:
+                tags_by_bv[BVid] = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+    missing = [BVid for BVid in BVids if BVid not in tags_by_bv]
+    if not missing:
+        return tags_by_bv
+
+    semaphore = asyncio.Semaphore(TAG_FETCH_CONCURRENCY)
+
+    async def fetch(BVid: str) -> list[str]:
+        async with semaphore:
+            return await get_video_tags(BVid, client)
+
+    for BVid, tags in zip(missing, await asyncio.gather(*(fetch(BVid) for BVid in missing))):
+        if tags != ['error']:
+            tags_by_bv[BVid] = tags
+    return tags_by_bv
+
+
+async def fetch_video_tags(BVid: str, client: AsyncClient) -> list[str] | None:
+    """
+    请求B站标签接口，每次从 cookie 池轮换取一个账号；失败时返回 None（不写入缓存）
+    """
+    headers = lambda cookie: {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36",
-        "Cookie": cookie
+        "Cookie": cookie or ""
     }
-
-    json_data = await client.get(url=f'https://api.bilibili.com/x/tag/archive/tags?bvid={BVid}', headers=headers)
-    print(json_data)
-    json_data = json_data.json()
+    response = await cookie_pool.fetch(client, "tag", f'{BILIBILI_API_BASE}/x/tag/archive/tags?bvid={BVid}', headers)
+    if response is None:
+        return None
     try:
-        tags = [tag["tag_name"] for tag in json_data["data"]]
-        return tags
-    except:
-        return ['error']
+        return [tag["tag_name"] for tag in response.json()["data"]]
+    except (ValueError, KeyError, TypeError):
+        print(f"视频 {BVid} 标签解析失败，状态码: {response.status_code}")
+        return None
 
 
+async def worker_fetch_tags(redis: RedisClientAsync, queue: asyncio.Queue) -> None:
+    """
+    流水线第一阶段：读取入库请求、过滤已入库的 BV、并发取标签，放入队列交给编码阶段。
+    队列满时（编码跟不上）在此等待，不会无限预取
+    """
+    client = get_http_client()
+    # 记住上一批最后的消息 id，避免两次读取之间到达的消息因为 "$" 被跳过
+    last_id = "$"
+    while True:
+        try:
+            BVids, forced, last_id = await read_insert_batch(redis, last_id)
+        except Exception as e:
+            print(f"读取入库请求失败: {e}")
+            await asyncio.sleep(WORKER_RETRY_DELAY)
+            continue
+        if not BVids:
+            continue
+        try:
+            BVids = await filter_unindexed(BVids, redis, forced)
+            tags_by_bv = await get_video_tags_batch(BVids, client, redis) if BVids else {}
+        except Exception as e:
+            print(f"获取视频标签失败 {BVids}: {e}")
+            continue
+        if tags_by_bv:
+            await queue.put(tags_by_bv)
 
-async def worker_insert_vector(redis: RedisClientAsync, millvus: MilvusClient):
+async def worker_encode_vectors(redis: RedisClientAsync, millvus: MilvusClient, queue: asyncio.Queue) -> None:
+    """
+    流水线第二阶段：编码并写入向量库。编码在线程（或向量服务）中进行，期间第一阶段继续取下一批标签
+    """
+    while True:
+        tags_by_bv = await queue.get()
+        try:
+            await encode_and_insert(tags_by_bv, redis, millvus)
+        except Exception as e:
+            print(f"批量写入向量失败 {list(tags_by_bv)}: {e}")
 
+async def worker_insert_vector(redis: RedisClientAsync, millvus: MilvusClient):
+    queue: asyncio.Queue[dict[str, list[str]]] = asyncio.Queue(maxsize=TAG_QUEUE_SIZE)
+    await asyncio.gather(
+        worker_fetch_tags(redis, queue),
+        worker_encode_vectors(redis, millvus, queue),
+    )
 
-    async with httpx.AsyncClient() as client:
-        while True:
-            data = await redis.get_streams(VECTOR_INSRET)
-            bv_id = redis.get_streams_dict(data)["BV"]
-            await insert_vector_by_BV(bv_id, client, redis, millvus)
+async def handle_tuijian_request(fields: dict, redis: RedisClientAsync, millvus: MilvusClient) -> None:
+    user_id = fields['user_id']
+    try:
+        result = await get_tuijian_bvs(user_id, redis, millvus)
+    except Exception as e:
+        print(f"生成用户 {user_id} 的推荐失败: {e}")
+        result = None
+    reply_key = fields.get('reply_key')
+    if reply_key:
+        await redis.push_reply(reply_key, json.dumps(result), ex=TUIJIAN_REPLY_TTL)
+    else:
+        # 兼容未携带 reply_key 的旧版请求方
+        await redis.add_streams(VECTOR_TUIJIAN_RESULT, {'user_id': user_id, 'data': json.dumps(result)})
 
 async def worker_get_tuijian_bvs(redis: RedisClientAsync, millvus: MilvusClient):
+    last_id = "$"
     while True:
-        data = await redis.get_streams(VECTOR_TUIJIAN)
-        user_id = redis.get_streams_dict(data)['user_id']
-        result = await get_tuijian_bvs(user_id, redis, millvus)
-        await redis.add_streams(VECTOR_TUIJIAN_RESULT, {'user_id': user_id, 'data': json.dumps(result)})
+        try:
+            entries = await redis.read_streams(VECTOR_TUIJIAN, last_id, count=TUIJIAN_BATCH_SIZE, block=0)
+            if not entries:
+                continue
+            last_id = entries[-1][0]
+            results = await asyncio.gather(*(handle_tuijian_request(fields, redis, millvus) for _, fields in entries),
+                                           return_exceptions=True)
+            for (msg_id, fields), result in zip(entries, results):
+                if isinstance(result, Exception):
+                    print(f"处理推荐请求 {msg_id} 失败 {fields}: {result}")
+        except Exception as e:
+            print(f"读取推荐请求失败: {e}")
+            await asyncio.sleep(WORKER_RETRY_DELAY)
+
+async def save_tuijian_results(results: dict[str, list[str] | None], redis: RedisClientAsync) -> None:
+    """
+    推荐结果一次 pipeline 写回 {uid}_videos，格式与 /start_tuijian 写入的一致
+    """
+    pipe = redis.redis_client.pipeline()
+    for user_id, bvs in results.items():
+        if bvs is not None:
+            pipe.set(f"{user_id}_videos", json.dumps(bvs))
+    await pipe.execute()
+
+async def run_tuijian_job(job_id: str, user_ids: list[str], redis: RedisClientAsync, millvus: MilvusClient) -> None:
+    user_ids = list(dict.fromkeys(user_ids))
+    status = {"status": "Running", "total": len(user_ids), "done": 0, "empty": 0, "failed": 0}
+    await redis.set_job_status(job_id, status, TUIJIAN_JOB_TTL)
+    for start in range(0, len(user_ids), TUIJIAN_JOB_CHUNK):
+        chunk = user_ids[start:start + TUIJIAN_JOB_CHUNK]
+        try:
+            results = await get_tuijian_bvs_batch(chunk, redis, millvus)
+            await save_tuijian_results(results, redis)
+            status["empty"] += sum(1 for bvs in results.values() if bvs is None)
+        except Exception as e:
+            print(f"批量推荐任务 {job_id} 第 {start} 个用户起的一批失败: {e}")
+            status["failed"] += len(chunk)
+        status["done"] += len(chunk)
+        await redis.set_job_status(job_id, status, TUIJIAN_JOB_TTL)
+    status["status"] = "Completed"
+    await redis.set_job_status(job_id, status, TUIJIAN_JOB_TTL)
+    print(f"批量推荐任务 {job_id} 完成: {status}")
+
+async def worker_update_profiles(redis: RedisClientAsync):
+    """
+    评论入库后由 API 侧提交画像更新请求，这里按批合并：一次读取评论、分片编码新评论、一次写回画像
+    """
+    last_id = "$"
+    while True:
+        try:
+            entries = await redis.read_streams(VECTOR_PROFILE_UPDATE, last_id, count=PROFILE_UPDATE_BATCH, block=0)
+        except Exception as e:
+            print(f"读取画像更新请求失败: {e}")
+            await asyncio.sleep(WORKER_RETRY_DELAY)
+            continue
+        if not entries:
+            continue
+        last_id = entries[-1][0]
+        user_ids = list(dict.fromkeys(fields["uid"] for _, fields in entries if fields.get("uid")))
+        try:
+            await update_profiles(user_ids, redis)
+        except Exception as e:
+            print(f"更新用户画像失败 {user_ids}: {e}")
+
+async def worker_tuijian_batch(redis: RedisClientAsync, millvus: MilvusClient):
+    last_id = "$"
+    while True:
+        try:
+            entries = await redis.read_streams(VECTOR_TUIJIAN_BATCH, last_id, count=1, block=0)
+        except Exception as e:
+            print(f"读取批量推荐任务失败: {e}")
+            await asyncio.sleep(WORKER_RETRY_DELAY)
+            continue
+        if not entries:
+            continue
+        last_id, fields = entries[-1]
+        try:
+            job_id, user_ids = fields["job_id"], json.loads(fields["uids"])
+        except (KeyError, json.JSONDecodeError):
+            print(f"无效的批量推荐任务: {fields}")
+            continue
+        try:
+            await run_tuijian_job(job_id, user_ids, redis, millvus)
+        except Exception as e:
+            print(f"批量推荐任务 {job_id} 失败: {e}")
+
+async def load_model() -> None:
+    global model, embedding_cache, profile_store
+    if EMBEDDING_SERVER:
+        model = await EmbeddingClient(EMBEDDING_SERVER).connect(wait=EMBEDDING_CONNECT_WAIT)
+        print(f"已连接向量服务 {EMBEDDING_SERVER}，模型 {model.model_id}")
+    else:
+        model = await asyncio.to_thread(get_embedding_backend)
+    embedding_cache = EmbeddingCache(model.model_id)
+    profile_store = UserProfileStore(model.model_id, cache=embedding_cache) # type: ignore
 
 
 async def run() -> None:
+    await load_model()
     redis = RedisClientAsync()
-    millvus = MilvusClient()
+    millvus = get_vector_store()
+    print(f"已加载 {await tag_index.load(redis.redis_client)} 个视频的标签索引")
 
     await asyncio.gather(
         worker_insert_vector(redis, millvus),
-        worker_get_tuijian_bvs(redis, millvus)
+        worker_get_tuijian_bvs(redis, millvus),
+        worker_tuijian_batch(redis, millvus),
+        worker_update_profiles(redis)
         )
 
 def main():
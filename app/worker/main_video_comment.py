@@ -1,6 +1,7 @@
 import asyncio
 from app.database.redis_client_async import RedisClientAsync
 from app.worker.utils import comment_analyzer
+from app.utils.bilibili import get_video_comments
 import json
 
 STREAMS_NAME = "streams_analyze_video_comments"
@@ -35,6 +36,13 @@ async def run() -> None:
             bv = data['BV']
             print(f"Worker: 收到分析任务 {bv}")
             
+            if data.get('stream') == '1':
+                # 流式任务：优先使用缓存 / 增量同步的评论，缓存为空时边抓取边分析并在结束后写入缓存
+                pages = get_video_comments.iter_cached_comment_pages(bv)
+                await comment_analyzer.analyze_bv_comment_stream(bv, pages)
+                await redis_client.del_stream_key(STREAMS_NAME, msg_id)
+                continue
+
             bv_data = await redis_client.get(bv)
             if bv_data:
                 await comment_analyzer.analyze_bv_comments(bv, json.loads(bv_data))
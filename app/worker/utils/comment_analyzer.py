@@ -1,6 +1,6 @@
 import asyncio
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from collections import Counter
 import re
 from datetime import datetime
@@ -10,6 +10,9 @@ from app.database.redis_client_async import RedisClientAsync
 
 RESULT_STREAM = "streams_result_isok"
 
+SENTIMENT_SAMPLE_SIZE = 50
+STOP_WORDS = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '上', '也', '很', '到', '说', '要', '去', '你', '会', '吧', '那', '才'}
+
 # 延迟初始化分类器
 _classifier = None
 
@@ -61,12 +64,55 @@ class CommentAnalyzer:
             await self.redis_client.add_streams(RESULT_STREAM, {'BV': bv_id})
             return error_res
 
-    def _preprocess_comments(self, comments: List[Dict[str, Any]]) -> tuple:
+    async def analyze_comment_stream(self, pages: AsyncIterator[List[Dict[str, Any]]], bv_id: str) -> Dict[str, Any]:
+        """
+        流式分析：每到达一页就清洗并累加统计，同时把阶段性结果写入 comment_analysis_partial_{bv_id}，
+        内存中只保留当前页和累计计数器
+        """
+        analysis_result = {"bv_id": bv_id, "timestamp": datetime.now().isoformat()}
+        stats = IncrementalCommentStats(self)
+        try:
+            async for page in pages:
+                stats.add_page(page)
+                partial = {**analysis_result, **stats.snapshot(), "partial": True, "pages_processed": stats.pages}
+                await self.redis_client.set(f"comment_analysis_partial_{bv_id}", json.dumps(partial, ensure_ascii=False), ex=600)
+
+            if stats.raw_total == 0:
+                error_res = {"error": "没有获取到视频评论数据", "bv_id": bv_id}
+            elif stats.cleaned_total == 0:
+                error_res = {"error": "清洗后无有效语义内容", "cleaning_report": stats.snapshot()["cleaning_report"]}
+            else:
+                error_res = None
+            if error_res:
+                await self.redis_client.set(f"comment_analysis_{bv_id}", json.dumps(error_res, ensure_ascii=False))
+                await self.redis_client.add_streams(RESULT_STREAM, {'BV': bv_id})
+                return error_res
+
+            analysis_result.update(stats.snapshot())
+            analysis_result["sentiment_analysis"] = await self._sentiment_analysis_pipeline(stats.sentiment_samples) # type: ignore
+
+            await self.redis_client.set(f"comment_analysis_{bv_id}", json.dumps(analysis_result, ensure_ascii=False))
+            await self.redis_client.add_streams(RESULT_STREAM, {'BV': bv_id})
+            return analysis_result
+
+        except Exception as e:
+            error_res = {"error": f"分析引擎内部异常: {str(e)}", "bv_id": bv_id}
+            await self.redis_client.set(f"comment_analysis_{bv_id}", json.dumps(error_res, ensure_ascii=False))
+            await self.redis_client.add_streams(RESULT_STREAM, {'BV': bv_id})
+            return error_res
+        finally:
+            await self.redis_client.redis_client.delete(f"comment_analysis_partial_{bv_id}")
+
+    def _preprocess_comments(self, comments: List[Dict[str, Any]], seen: set | None = None,
+                             noise_details: Dict[str, int] | None = None) -> tuple:
         raw_count = len(comments)
-        noise_details = {"check_in": 0, "spam": 0, "short_noise": 0, "lottery": 0}
+        if noise_details is None:
+            noise_details = {"check_in": 0, "spam": 0, "short_noise": 0, "lottery": 0}
         check_in_patterns = [r"打卡", r"第一", r"前排", r"来了", r"报道"]
         lottery_patterns = [r"抽奖", r"欧皇", r"转发", r"选我", r"万一呢"]
-        cleaned, seen = [], set()
+        cleaned = []
+        if seen is None:
+            seen = set()
         for comment in comments:
             text = str(comment.get('comment_text', '')).strip()
             if text in seen or len(text) < 2:
@@ -91,8 +137,7 @@ class CommentAnalyzer:
         return cleaned, stats
 
     async def _sentiment_analysis_pipeline(self, comments: List[Dict[str, Any]]) -> Dict[str, Any]:
-        sample_size = 50
-        analysis_samples = comments[:sample_size]
+        analysis_samples = comments[:SENTIMENT_SAMPLE_SIZE]
         texts = [str(c['comment_text'])[:200] for c in analysis_samples]
         classifier = get_classifier()
         results = await asyncio.to_thread(classifier, texts, truncation=True, padding=True, max_length=512)
@@ -109,10 +154,7 @@ class CommentAnalyzer:
         # 计算长度分布用于图表
         dist = {"0-20": 0, "21-50": 0, "51-100": 0, "100+": 0}
         for l in lengths:
-            if l <= 20: dist["0-20"] += 1
-            elif l <= 50: dist["21-50"] += 1
-            elif l <= 100: dist["51-100"] += 1
-            else: dist["100+"] += 1
+            dist[_length_bucket(l)] += 1
         return {
             "total_comments": len(comments), 
             "unique_users": len(set(c.get('user_name', '') for c in comments)),
@@ -122,10 +164,7 @@ class CommentAnalyzer:
 
     def _keyword_analysis(self, comments: List[Dict[str, Any]]) -> Dict[str, Any]:
         all_text = " ".join([str(c.get('comment_text', '')) for c in comments])
-        words = jieba.cut(all_text)
-        stop = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '上', '也', '很', '到', '说', '要', '去', '你', '会', '吧', '那', '才'}
-        filtered = [w for w in words if len(w) > 1 and w not in stop and not w.isdigit()]
-        top_k = Counter(filtered).most_common(20)
+        top_k = Counter(_extract_keywords(all_text)).most_common(20)
         return {"top_keywords": [{"word": k, "count": v} for k, v in top_k]}
 
     def _user_activity_analysis(self, comments: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -136,5 +175,69 @@ class CommentAnalyzer:
             "total_unique_users": len(counts)
         }
 
+def _length_bucket(length: int) -> str:
+    if length <= 20: return "0-20"
+    elif length <= 50: return "21-50"
+    elif length <= 100: return "51-100"
+    return "100+"
+
+def _extract_keywords(text: str) -> List[str]:
+    return [w for w in jieba.cut(text) if len(w) > 1 and w not in STOP_WORDS and not w.isdigit()]
+
+
+class IncrementalCommentStats:
+    """
+    逐页累加的评论统计，输出结构与 CommentAnalyzer 的批量结果一致（情感分析除外）
+    """
+    def __init__(self, analyzer: CommentAnalyzer):
+        self.analyzer = analyzer
+        self.pages = 0
+        self.raw_total = 0
+        self.cleaned_total = 0
+        self.length_sum = 0
+        self.seen: set = set()
+        self.noise_details = {"check_in": 0, "spam": 0, "short_noise": 0, "lottery": 0}
+        self.length_distribution = {"0-20": 0, "21-50": 0, "51-100": 0, "100+": 0}
+        self.user_counts: Counter = Counter()
+        self.keyword_counts: Counter = Counter()
+        self.sentiment_samples: List[Dict[str, Any]] = []
+
+    def add_page(self, comments: List[Dict[str, Any]]) -> None:
+        cleaned, _ = self.analyzer._preprocess_comments(comments, self.seen, self.noise_details)
+        self.pages += 1
+        self.raw_total += len(comments)
+        self.cleaned_total += len(cleaned)
+        for comment in cleaned:
+            text = str(comment.get('comment_text', ''))
+            self.length_sum += len(text)
+            self.length_distribution[_length_bucket(len(text))] += 1
+            self.user_counts[comment.get('user_name', '')] += 1
+        self.keyword_counts.update(_extract_keywords(" ".join(str(c.get('comment_text', '')) for c in cleaned)))
+        if len(self.sentiment_samples) < SENTIMENT_SAMPLE_SIZE:
+            self.sentiment_samples.extend(cleaned[:SENTIMENT_SAMPLE_SIZE - len(self.sentiment_samples)])
+
+    def snapshot(self) -> Dict[str, Any]:
+        raw, cleaned = self.raw_total, self.cleaned_total
+        return {
+            "cleaning_report": {"raw_total": raw, "cleaned_total": cleaned, "filtered_out": raw - cleaned,
+                                "efficiency": round((cleaned/raw)*100, 1) if raw > 0 else 0,
+                                "noise_breakdown": dict(self.noise_details)},
+            "basic_stats": {
+                "total_comments": cleaned,
+                "unique_users": len(self.user_counts),
+                "average_length": round(self.length_sum/cleaned, 1) if cleaned else 0,
+                "length_distribution": dict(self.length_distribution)
+            },
+            "keyword_analysis": {"top_keywords": [{"word": k, "count": v} for k, v in self.keyword_counts.most_common(20)]},
+            "user_activity": {
+                "most_active_users": [{"username": u, "comment_count": c} for u, c in self.user_counts.most_common(10)],
+                "total_unique_users": len(self.user_counts)
+            },
+        }
+
+
 async def analyze_bv_comments(bv_id: str, comments: List[Dict[str, Any]]) -> Dict[str, Any]:
     return await CommentAnalyzer().analyze_comments(comments, bv_id)
+
+async def analyze_bv_comment_stream(bv_id: str, pages: AsyncIterator[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    return await CommentAnalyzer().analyze_comment_stream(pages, bv_id)
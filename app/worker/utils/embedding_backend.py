@@ -0,0 +1,140 @@
+"""
+可替换的文本向量后端，两种实现输出相同的 768 维、L2 归一化向量：
+
+- torch: sentence-transformers 原始模型（默认）
+- onnx:  导出为 ONNX 并做 int8 动态量化的模型，在纯 CPU 节点上更快
+
+通过环境变量 EMBEDDING_BACKEND=torch|onnx 切换。ONNX 模型需要先导出一次：
+
+    python -m app.worker.utils.embedding_backend export --output ~/.cache/bilibili_nlp/onnx/bge-base-zh
+"""
+import argparse
+import os
+import numpy as np
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-zh")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "bilibili_nlp", "onnx", "bge-base-zh"),
+)
+ONNX_MODEL_FILE = "model_int8.onnx"
+MAX_SEQ_LENGTH = 512
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerBackend:
+    """
+    原有的 PyTorch 全精度模型
+    """
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.model_id = model_name
+
+    def encode(self, texts: str | list[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True, **kwargs)
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime + int8 动态量化模型，CLS 池化后做 L2 归一化，与 bge 的 sentence-transformers 配置一致
+    """
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, model_name: str = EMBEDDING_MODEL):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"未找到 ONNX 模型 {model_path}，请先运行 embedding_backend export")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        # 量化后的向量与原模型略有差异，缓存 key 需要区分
+        self.model_id = f"{model_name}@onnx-int8"
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors="np")
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        last_hidden_state = self.session.run(None, feed)[0]
+        return normalize(last_hidden_state[:, 0].astype(np.float32))
+
+    def encode(self, texts: str | list[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 768), dtype=np.float32)
+        # 按长度排序后分批，减少 padding 带来的无效计算
+        order = np.argsort([len(t) for t in texts])
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            index = order[start:start + batch_size]
+            batches.append((index, self._encode_batch([texts[i] for i in index])))
+        result = np.empty((len(texts), batches[0][1].shape[1]), dtype=np.float32)
+        for index, vectors in batches:
+            result[index] = vectors
+        return result[0] if single else result
+
+
+def get_embedding_backend(name: str = EMBEDDING_BACKEND):
+    if name == "onnx":
+        return OnnxBackend()
+    if name == "torch":
+        return SentenceTransformerBackend()
+    raise ValueError(f"未知的 EMBEDDING_BACKEND: {name}")
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, model_name: str = EMBEDDING_MODEL) -> str:
+    """
+    导出 transformer 主体为 ONNX，再做 int8 动态量化（只量化权重，无需校准数据）
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    sample = tokenizer(["示例文本"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"已导出量化模型: {int8_path}")
+    return int8_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文本向量后端工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="导出并量化 ONNX 模型")
+    export.add_argument("--output", default=ONNX_MODEL_DIR)
+    export.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+    if args.command == "export":
+        export_onnx(os.path.expanduser(args.output), args.model)
+
+
+if __name__ == '__main__':
+    main()
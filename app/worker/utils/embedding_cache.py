@@ -0,0 +1,93 @@
+import asyncio
+import base64
+import hashlib
+import inspect
+import os
+import time
+import numpy as np
+from app.database.redis_client_async import RedisClientAsync
+
+# 缓存条目上限，超过后按最近使用时间淘汰
+EMBEDDING_CACHE_MAX = int(os.getenv("EMBEDDING_CACHE_MAX", 200000))
+# 每条缓存的过期时间（秒），作为 LRU 之外的兜底
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 30 * 86400))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def pack_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+def unpack_vector(value: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+
+
+class EmbeddingCache:
+    """
+    以 (模型, 文本 sha1) 为 key 的向量缓存，向量以 float32 base64 存在 Redis：
+    emb:{model_id}:{sha1} 保存向量，emb_lru:{model_id} 有序集合记录最近使用时间，用于限制总量
+    """
+    def __init__(self, model_id: str, redis_client=None, max_size: int = EMBEDDING_CACHE_MAX):
+        self.model_id = model_id
+        self.max_size = max_size
+        self.redis = redis_client if redis_client is not None else RedisClientAsync().redis_client
+
+    def key(self, digest: str) -> str:
+        return f"emb:{self.model_id}:{digest}"
+
+    @property
+    def lru_key(self) -> str:
+        return f"emb_lru:{self.model_id}"
+
+    async def get_many(self, digests: list[str]) -> list[np.ndarray | None]:
+        if not digests:
+            return []
+        values = await self.redis.mget([self.key(d) for d in digests])
+        now = time.time()
+        hits = {d: now for d, v in zip(digests, values) if v is not None}
+        if hits:
+            await self.redis.zadd(self.lru_key, hits)
+        return [unpack_vector(v) if v is not None else None for v in values]
+
+    async def set_many(self, items: dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        now = time.time()
+        pipe = self.redis.pipeline()
+        for digest, vector in items.items():
+            pipe.set(self.key(digest), pack_vector(vector), ex=EMBEDDING_CACHE_TTL)
+        pipe.zadd(self.lru_key, {digest: now for digest in items})
+        pipe.zcard(self.lru_key)
+        size = (await pipe.execute())[-1]
+        if size > self.max_size:
+            await self.evict(size - self.max_size)
+
+    async def evict(self, count: int) -> None:
+        oldest = await self.redis.zpopmin(self.lru_key, count)
+        if oldest:
+            await self.redis.delete(*(self.key(digest) for digest, _ in oldest))
+
+    async def encode_cached(self, model, texts: list[str], **encode_kwargs) -> np.ndarray:
+        """
+        批量编码：先用 MGET 查缓存，只把未命中的去重文本交给 model.encode，再回写缓存。
+        返回与 texts 一一对应的 float32 矩阵
+        """
+        digests = [text_hash(text) for text in texts]
+        cached = await self.get_many(digests)
+        missing = list(dict.fromkeys(d for d, v in zip(digests, cached) if v is None))
+
+        encoded: dict[str, np.ndarray] = {}
+        if missing:
+            text_by_digest = dict(zip(digests, texts))
+            texts_to_encode = [text_by_digest[d] for d in missing]
+            if inspect.iscoroutinefunction(model.encode):
+                # 向量服务客户端的 encode 是协程
+                vectors = await model.encode(texts_to_encode, **encode_kwargs)
+            else:
+                # 进程内模型在线程中编码，事件循环可以继续处理网络 I/O
+                vectors = await asyncio.to_thread(model.encode, texts_to_encode, **encode_kwargs)
+            encoded = {d: np.asarray(v, dtype=np.float32) for d, v in zip(missing, vectors)}
+            await self.set_many(encoded)
+
+        return np.stack([v if v is not None else encoded[d] for d, v in zip(digests, cached)])
@@ -0,0 +1,163 @@
+"""
+本机向量服务（app.worker.main_embedding）的客户端与通信协议。
+
+每个节点只常驻一份模型，各 Worker 通过 Unix socket 或 localhost TCP 请求编码，
+服务端把同一时间窗内所有调用方的文本合并成一批再送入模型。
+
+协议：每帧为 4 字节大端长度 + msgpack 消息
+    请求  {"id": int, "op": "info"}                     -> {"id", "model_id", "dim"}
+    请求  {"id": int, "op": "encode", "texts": [str]}   -> {"id", "dim", "vectors": float32 bytes}
+    出错时应答 {"id", "error": str}
+
+地址格式：unix:/path/to/socket 或 tcp:host:port
+"""
+import asyncio
+import itertools
+import os
+import struct
+import msgspec
+import numpy as np
+
+# 为空表示在 Worker 进程内加载模型，否则连接该地址的向量服务
+EMBEDDING_SERVER = os.getenv("EMBEDDING_SERVER", "")
+DEFAULT_EMBEDDING_SERVER = "unix:/tmp/bilibili_nlp_embedding.sock"
+EMBEDDING_CLIENT_TIMEOUT = float(os.getenv("EMBEDDING_CLIENT_TIMEOUT", 120))
+# 启动时等待向量服务就绪的最长秒数
+EMBEDDING_CONNECT_WAIT = float(os.getenv("EMBEDDING_CONNECT_WAIT", 120))
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder()
+_header = struct.Struct(">I")
+
+
+class EmbeddingServerError(Exception):
+    pass
+
+
+def parse_address(address: str) -> tuple[str, str | tuple[str, int]]:
+    """
+    解析地址，返回 ("unix", path) 或 ("tcp", (host, port))
+    """
+    scheme, _, rest = address.partition(":")
+    if scheme == "unix" and rest:
+        return "unix", rest
+    if scheme == "tcp" and rest:
+        host, _, port = rest.rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"无效的向量服务地址: {address}")
+
+
+async def open_connection(address: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target) # type: ignore
+    host, port = target # type: ignore
+    return await asyncio.open_connection(host, port)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (size,) = _header.unpack(await reader.readexactly(_header.size))
+    if size > MAX_FRAME_SIZE:
+        raise EmbeddingServerError(f"消息过大: {size} 字节")
+    return _decoder.decode(await reader.readexactly(size))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: dict) -> None:
+    payload = _encoder.encode(message)
+    writer.write(_header.pack(len(payload)) + payload)
+
+
+class EmbeddingClient:
+    """
+    与 SentenceTransformerBackend / OnnxBackend 接口一致（model_id、encode），encode 为协程。
+    一条长连接上可以同时有多个请求在途，应答按 id 分发；连接断开后下次请求自动重连
+    """
+    def __init__(self, address: str = EMBEDDING_SERVER or DEFAULT_EMBEDDING_SERVER,
+                 timeout: float = EMBEDDING_CLIENT_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.model_id: str | None = None
+        self.dim: int | None = None
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self, wait: float = 0) -> "EmbeddingClient":
+        """
+        建立连接并获取服务端的 model_id（用于区分向量缓存）。
+        服务端可能仍在加载模型，wait 秒内连接失败会重试
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            try:
+                info = await self._request({"op": "info"})
+                break
+            except (OSError, EmbeddingServerError):
+                if loop.time() >= deadline:
+                    raise
+                await asyncio.sleep(1)
+        self.model_id, self.dim = info["model_id"], info["dim"]
+        return self
+
+    async def _ensure_connected(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await open_connection(self.address)
+                self._reader_task = asyncio.create_task(self._read_loop(reader))
+            return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        error: Exception = EmbeddingServerError("向量服务连接已关闭")
+        try:
+            while True:
+                message = await read_frame(reader)
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError, EmbeddingServerError) as e:
+            error = e if isinstance(e, EmbeddingServerError) else error
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def _request(self, message: dict) -> dict:
+        writer = await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        write_frame(writer, {"id": request_id, **message})
+        await writer.drain()
+        try:
+            reply = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in reply:
+            raise EmbeddingServerError(reply["error"])
+        return reply
+
+    async def encode(self, texts: str | list[str], **kwargs) -> np.ndarray:
+        """
+        batch_size 等参数由服务端统一决定，这里忽略
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        reply = await self._request({"op": "encode", "texts": texts})
+        vectors = np.frombuffer(reply["vectors"], dtype=np.float32).reshape(len(texts), reply["dim"])
+        return vectors[0] if single else vectors
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
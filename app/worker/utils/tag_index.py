@@ -0,0 +1,189 @@
+import json
+import math
+import os
+from collections import Counter
+import jieba
+import numpy as np
+from app.database.redis_client_async import RedisClientAsync
+
+# Redis 哈希：BV -> 标签列表（JSON），由向量 Worker 入库时写入
+VIDEO_TAGS_KEY = "video_tags"
+# 标签哈希的版本号，每次写入标签时加一；各 Worker 进程据此判断是否需要重新加载
+VIDEO_TAGS_VERSION_KEY = "video_tags_version"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+# 从用户评论中提取的查询词数量上限
+QUERY_TERMS = int(os.getenv("HYBRID_QUERY_TERMS", 32))
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in jieba.cut(text.lower()) if len(w.strip()) > 1 and not w.isdigit()]
+
+
+def tokenize_tags(tags: list[str]) -> list[str]:
+    # 标签本身作为一个词，同时加入分词结果，长标签也能被部分匹配
+    tokens = []
+    for tag in tags:
+        tag = tag.strip().lower()
+        if not tag:
+            continue
+        tokens.append(tag)
+        tokens.extend(t for t in tokenize(tag) if t != tag)
+    return tokens
+
+
+class TagIndex:
+    """
+    视频标签的 BM25 倒排索引，常驻 Worker 内存：
+    每个词对应 (文档号数组, 词频数组)，检索时用 NumPy 向量化累加得分
+    """
+    def __init__(self):
+        self.doc_ids: list[str] = []
+        self.doc_of: dict[str, int] = {}
+        self.doc_len: list[int] = []
+        self.doc_terms: list[set[str]] = []
+        self.postings: dict[str, dict[int, int]] = {}
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_len_arr: np.ndarray | None = None
+        # 上次加载时的标签版本号，None 表示尚未加载
+        self.version: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, video_id: str, tags: list[str]) -> None:
+        """
+        加入或替换一个视频的标签
+        """
+        tokens = tokenize_tags(tags)
+        counts = Counter(tokens)
+        if video_id in self.doc_of:
+            doc = self.doc_of[video_id]
+            for term in self.doc_terms[doc]:
+                self.postings[term].pop(doc, None)
+                self._arrays.pop(term, None)
+            self.doc_len[doc] = len(tokens)
+            self.doc_terms[doc] = set(counts)
+        else:
+            doc = len(self.doc_ids)
+            self.doc_of[video_id] = doc
+            self.doc_ids.append(video_id)
+            self.doc_len.append(len(tokens))
+            self.doc_terms.append(set(counts))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc] = tf
+            self._arrays.pop(term, None)
+        self._doc_len_arr = None
+
+    def _posting_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings.get(term, {})
+            arrays = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                      np.fromiter(posting.values(), dtype=np.float32, count=len(posting)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query_terms: list[str] | dict[str, float], top_k: int = 20) -> list[tuple[str, float]]:
+        """
+        BM25 检索，query_terms 可以带权重（如词在用户评论中的出现次数）
+        """
+        n = len(self.doc_ids)
+        if n == 0 or not query_terms:
+            return []
+        if self._doc_len_arr is None:
+            self._doc_len_arr = np.asarray(self.doc_len, dtype=np.float32)
+        doc_len = self._doc_len_arr
+        avg_len = max(float(doc_len.mean()), 1e-6)
+        weights = query_terms if isinstance(query_terms, dict) else Counter(query_terms)
+
+        scores = np.zeros(n, dtype=np.float32)
+        for term, weight in weights.items():
+            docs, tf = self._posting_arrays(term)
+            if len(docs) == 0:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len[docs] / avg_len)
+            np.add.at(scores, docs, weight * idf * tf * (BM25_K1 + 1) / norm)
+
+        hits = np.flatnonzero(scores)
+        if len(hits) == 0:
+            return []
+        best = hits[np.argsort(-scores[hits], kind="stable")[:top_k]]
+        return [(self.doc_ids[i], float(scores[i])) for i in best]
+
+    async def save(self, tags_by_bv: dict[str, list[str]], redis=None) -> None:
+        """
+        标签写入 Redis 哈希并递增版本号，同时加入本进程的索引。
+        期间没有其他进程写入时直接记下新版本号，本进程不必再重新加载
+        """
+        redis = redis if redis is not None else RedisClientAsync().redis_client
+        pipe = redis.pipeline()
+        pipe.hset(VIDEO_TAGS_KEY, mapping={
+            BVid: json.dumps(tags, ensure_ascii=False) for BVid, tags in tags_by_bv.items()
+        })
+        pipe.incr(VIDEO_TAGS_VERSION_KEY)
+        _, version = await pipe.execute()
+        for BVid, tags in tags_by_bv.items():
+            self.add(BVid, tags)
+        if self.version is not None and int(version) == self.version + 1:
+            self.version = int(version)
+
+    async def load(self, redis=None) -> int:
+        """
+        从 Redis 的 video_tags 哈希全量加载，返回加载的视频数。
+        版本号在扫描前读取，扫描期间的新写入会在下次 refresh 时再加载
+        """
+        redis = redis if redis is not None else RedisClientAsync().redis_client
+        version = int(await redis.get(VIDEO_TAGS_VERSION_KEY) or 0)
+        count = 0
+        async for video_id, raw in redis.hscan_iter(VIDEO_TAGS_KEY, count=1000):
+            try:
+                self.add(video_id, json.loads(raw))
+                count += 1
+            except (json.JSONDecodeError, TypeError):
+                continue
+        self.version = version
+        return count
+
+    async def refresh(self, redis=None) -> None:
+        """
+        其他 Worker 进程写入了新标签时（版本号与上次加载的不一致）重新加载
+        """
+        redis = redis if redis is not None else RedisClientAsync().redis_client
+        if int(await redis.get(VIDEO_TAGS_VERSION_KEY) or 0) != self.version:
+            await self.load(redis)
+
+
+def count_terms(texts: list[str]) -> Counter:
+    return Counter(t for text in texts for t in tokenize(text))
+
+
+def query_terms_from_counts(counts: dict[str, float], limit: int = QUERY_TERMS) -> dict[str, float]:
+    """
+    取出现最多的若干词作为查询，权重为出现次数的对数
+    """
+    return {term: 1 + math.log(c) for term, c in Counter(counts).most_common(limit) if c >= 1}
+
+
+def rrf_fuse(ranked_lists: list[list[str]], weights: list[float] | None = None,
+             top_k: int = 10, k: int = RRF_K) -> list[str]:
+    """
+    倒数排名融合：score(d) = Σ w_i / (k + rank_i(d))，对所有候选一次性向量化计算
+    """
+    ranked_lists = [list(dict.fromkeys(lst)) for lst in ranked_lists]
+    if not any(ranked_lists):
+        return []
+    weights = weights or [1.0] * len(ranked_lists)
+    candidates = list(dict.fromkeys(vid for lst in ranked_lists for vid in lst))
+    position = {vid: i for i, vid in enumerate(candidates)}
+
+    # ranks[i, j]：候选 j 在第 i 个列表中的名次（从 1 开始），不在列表中为 inf
+    ranks = np.full((len(ranked_lists), len(candidates)), np.inf)
+    for i, lst in enumerate(ranked_lists):
+        cols = [position[vid] for vid in lst]
+        ranks[i, cols] = np.arange(1, len(lst) + 1)
+    scores = (np.asarray(weights)[:, None] / (k + ranks)).sum(axis=0)
+    best = np.argsort(-scores, kind="stable")[:top_k]
+    return [candidates[i] for i in best]
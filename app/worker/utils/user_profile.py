@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from app.database.redis_client_async import RedisClientAsync
+from app.worker.utils.embedding_cache import EmbeddingCache, pack_vector, unpack_vector
+from app.worker.utils.tag_index import count_terms
+
+# 兴趣衰减半衰期（秒），越早加入的评论权重越低；设为 0 表示不衰减，即普通的累计平均
+PROFILE_HALF_LIFE = float(os.getenv("PROFILE_HALF_LIFE", 30 * 86400))
+# 已处理评论集合与画像的过期时间，长期不活跃的用户自动清理
+PROFILE_TTL = int(os.getenv("PROFILE_TTL", 180 * 86400))
+# 每个用户最多保留的兴趣中心数
+PROFILE_INTERESTS = int(os.getenv("PROFILE_INTERESTS", 3))
+# 新评论与所有兴趣中心的余弦相似度都低于该值时，开辟一个新的兴趣中心
+NEW_INTEREST_THRESHOLD = float(os.getenv("PROFILE_NEW_INTEREST_THRESHOLD", 0.75))
+# 画像中保留的评论高频词数量，供标签 BM25 召回直接使用，无需再读取全部评论
+PROFILE_TERMS = int(os.getenv("PROFILE_TERMS", 128))
+# 批量更新时每次交给模型（或向量服务）的文本数，避免一次请求过大而超时
+PROFILE_ENCODE_SLICE = int(os.getenv("PROFILE_ENCODE_SLICE", 64))
+
+
+def comment_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def decayed_mean_update(mean: np.ndarray | None, weight: float, updated_at: float,
+                        new_vectors: np.ndarray, now: float,
+                        half_life: float = PROFILE_HALF_LIFE) -> tuple[np.ndarray, float]:
+    """
+    带时间衰减的增量平均：旧均值按经过的时间衰减权重，再与新向量合并。
+    返回 (新均值, 新总权重)
+    """
+    new_vectors = np.atleast_2d(np.asarray(new_vectors, dtype=np.float32))
+    total = new_vectors.sum(axis=0)
+    count = float(len(new_vectors))
+    if mean is None or weight <= 0:
+        return total / count, count
+    decay = 0.5 ** (max(0.0, now - updated_at) / half_life) if half_life > 0 else 1.0
+    weight = weight * decay
+    return (mean * weight + total) / (weight + count), weight + count
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def online_kmeans_update(centroids: np.ndarray | None, counts: np.ndarray | None, new_vectors: np.ndarray,
+                         decay: float = 1.0, k: int = PROFILE_INTERESTS,
+                         threshold: float = NEW_INTEREST_THRESHOLD) -> tuple[np.ndarray, np.ndarray]:
+    """
+    在线 k-means：旧的计数先乘以衰减系数，每条新向量并入最近的中心（按计数做增量平均）；
+    中心数不足 k 且与所有中心都不够相似时，该向量自成一个新中心
+    """
+    vectors = normalize(np.atleast_2d(new_vectors))
+    if centroids is None or counts is None or len(centroids) == 0:
+        centroids = vectors[:1].copy()
+        counts = np.ones(1, dtype=np.float32)
+        vectors = vectors[1:]
+    else:
+        centroids = centroids.astype(np.float32).copy()
+        counts = counts.astype(np.float32) * decay
+
+    for vector in vectors:
+        similarity = normalize(centroids) @ vector
+        best = int(np.argmax(similarity))
+        if len(centroids) < k and similarity[best] < threshold:
+            centroids = np.vstack([centroids, vector])
+            counts = np.append(counts, np.float32(1))
+            continue
+        counts[best] += 1
+        centroids[best] += (vector - centroids[best]) / counts[best]
+    return centroids, counts
+
+
+def merge_with_quotas(results: list[list[str]], weights: list[float], total: int) -> list[str]:
+    """
+    合并多个兴趣中心的检索结果：按权重给每个中心分配名额（至少 1 个），去重后按名额轮流取，
+    名额用完仍不足 total 时再从剩余结果里按顺序补齐
+    """
+    if not results:
+        return []
+    weights = np.asarray(weights, dtype=np.float64)
+    shares = weights / weights.sum() if weights.sum() > 0 else np.full(len(results), 1 / len(results))
+    quotas = np.maximum(1, np.floor(shares * total)).astype(int)
+
+    merged: list[str] = []
+    seen: set[str] = set()
+    positions = [0] * len(results)
+    for round_quota in (quotas, [total] * len(results)):
+        taken = [0] * len(results)
+        progressed = True
+        while len(merged) < total and progressed:
+            progressed = False
+            for i in np.argsort(-shares, kind="stable"):
+                if taken[i] >= round_quota[i]:
+                    continue
+                while positions[i] < len(results[i]) and results[i][positions[i]] in seen:
+                    positions[i] += 1
+                if positions[i] >= len(results[i]):
+                    continue
+                video_id = results[i][positions[i]]
+                seen.add(video_id)
+                merged.append(video_id)
+                taken[i] += 1
+                progressed = True
+                if len(merged) >= total:
+                    break
+    return merged
+
+
+class UserProfileStore:
+    """
+    持久化的用户兴趣向量：逐条评论编码后做（可衰减的）累计平均。
+    user_profile:{model_id}:{uid} 哈希保存 vector / weight / updated_at，
+    user_profile_seen:{model_id}:{uid} 集合保存已计入的评论哈希，重复评论不会再次编码。
+    同时维护最多 PROFILE_INTERESTS 个兴趣中心（centroids / counts），用于多兴趣召回，
+    以及评论高频词计数（terms），用于标签召回。
+    画像在评论入库时由向量 Worker 更新，推荐时只读取画像
+    """
+    def __init__(self, model_id: str, redis_client=None, cache: EmbeddingCache | None = None):
+        self.model_id = model_id
+        self.redis = redis_client if redis_client is not None else RedisClientAsync().redis_client
+        self.cache = cache if cache is not None else EmbeddingCache(model_id, self.redis)
+
+    def profile_key(self, uid: str) -> str:
+        return f"user_profile:{self.model_id}:{uid}"
+
+    def seen_key(self, uid: str) -> str:
+        return f"user_profile_seen:{self.model_id}:{uid}"
+
+    @staticmethod
+    def parse(data: dict) -> dict:
+        """
+        把 Redis 哈希解析为 mean / weight / updated_at / centroids / counts / terms，缺失的字段为 None、0 或空
+        """
+        profile = {"mean": None, "weight": 0.0, "updated_at": 0.0, "centroids": None, "counts": None, "terms": {}}
+        if not data or "vector" not in data:
+            return profile
+        profile["mean"] = unpack_vector(data["vector"])
+        profile["weight"] = float(data.get("weight", 0))
+        profile["updated_at"] = float(data.get("updated_at", 0))
+        if "centroids" in data and "counts" in data:
+            counts = unpack_vector(data["counts"])
+            profile["counts"] = counts
+            profile["centroids"] = unpack_vector(data["centroids"]).reshape(len(counts), -1)
+        if "terms" in data:
+            try:
+                profile["terms"] = json.loads(data["terms"])
+            except json.JSONDecodeError:
+                pass
+        return profile
+
+    async def load(self, uid: str) -> dict:
+        return self.parse(await self.redis.hgetall(self.profile_key(uid)))
+
+    async def load_many(self, uids: list[str]) -> dict[str, dict]:
+        """
+        一次 pipeline 读取多个用户的画像
+        """
+        pipe = self.redis.pipeline()
+        for uid in uids:
+            pipe.hgetall(self.profile_key(uid))
+        return {uid: self.parse(data) for uid, data in zip(uids, await pipe.execute())}
+
+    async def update_many(self, texts_by_uid: dict[str, list[str]], model,
+                          slice_size: int = PROFILE_ENCODE_SLICE, **encode_kwargs) -> dict[str, dict]:
+        """
+        批量更新多个用户的画像：一次 pipeline 读取画像和已处理集合，所有用户的新评论合并后
+        按 slice_size 分片编码，再一次 pipeline 写回。某一片编码失败时，涉及的用户保留旧画像。
+        返回 uid -> 画像（字段同 parse）
+        """
+        uids = list(texts_by_uid)
+        texts_by_uid = {uid: [t for t in dict.fromkeys(texts) if t and t.strip()] for uid, texts in texts_by_uid.items()}
+        digests_by_uid = {uid: [comment_hash(t) for t in texts] for uid, texts in texts_by_uid.items()}
+        with_texts = [uid for uid in uids if texts_by_uid[uid]]
+
+        pipe = self.redis.pipeline()
+        for uid in uids:
+            pipe.hgetall(self.profile_key(uid))
+        for uid in with_texts:
+            pipe.smismember(self.seen_key(uid), digests_by_uid[uid])
+        replies = await pipe.execute()
+        profiles = {uid: self.parse(data) for uid, data in zip(uids, replies[:len(uids)])}
+        seen_by_uid = dict(zip(with_texts, replies[len(uids):]))
+
+        new_by_uid = {}
+        for uid in with_texts:
+            new = [(d, t) for d, t, done in zip(digests_by_uid[uid], texts_by_uid[uid], seen_by_uid[uid]) if not done]
+            if new:
+                new_by_uid[uid] = new
+        if not new_by_uid:
+            return profiles
+
+        all_texts = [t for new in new_by_uid.values() for _, t in new]
+        owners = [uid for uid, new in new_by_uid.items() for _ in new]
+        encoded: list = [None] * len(all_texts)
+        failed: set[str] = set()
+        for start in range(0, len(all_texts), slice_size):
+            part = all_texts[start:start + slice_size]
+            try:
+                encoded[start:start + len(part)] = list(await self.cache.encode_cached(model, part, **encode_kwargs))
+            except Exception as e:
+                # 只影响这一片涉及的用户：保留其旧画像，评论不记为已处理，下次重试
+                failed.update(owners[start:start + len(part)])
+                print(f"编码用户评论失败（{len(part)} 条）: {e}")
+
+        now = time.time()
+        pipe = self.redis.pipeline()
+        offset = 0
+        for uid, new in new_by_uid.items():
+            user_vectors = encoded[offset:offset + len(new)]
+            offset += len(new)
+            if uid in failed:
+                continue
+            user_vectors = np.stack(user_vectors)
+            profile = profiles[uid]
+            elapsed = max(0.0, now - profile["updated_at"])
+            decay = 0.5 ** (elapsed / PROFILE_HALF_LIFE) if PROFILE_HALF_LIFE > 0 else 1.0
+            mean, weight = decayed_mean_update(profile["mean"], profile["weight"], profile["updated_at"], user_vectors, now)
+            centroids, counts = online_kmeans_update(profile["centroids"], profile["counts"], user_vectors, decay)
+            terms = count_terms([t for _, t in new])
+            terms.update(profile["terms"])
+            terms = dict(terms.most_common(PROFILE_TERMS))
+            profiles[uid] = {"mean": mean, "weight": weight, "updated_at": now,
+                             "centroids": centroids, "counts": counts, "terms": terms}
+
+            pipe.hset(self.profile_key(uid), mapping={
+                "vector": pack_vector(mean), "weight": weight, "updated_at": now,
+                "centroids": pack_vector(centroids.ravel()), "counts": pack_vector(counts),
+                "terms": json.dumps(terms, ensure_ascii=False),
+            })
+            pipe.sadd(self.seen_key(uid), *(d for d, _ in new))
+            pipe.expire(self.profile_key(uid), PROFILE_TTL)
+            pipe.expire(self.seen_key(uid), PROFILE_TTL)
+        await pipe.execute()
+        return profiles
@@ -4,6 +4,7 @@
 cleanup() {
     echo ""
     echo "正在停止所有分析服务..."
+    [ -n "$embedding_pid" ] && kill $embedding_pid 2>/dev/null
     [ -n "$app_pid" ] && kill $app_pid 2>/dev/null
     [ -n "$vector_pid" ] && kill $vector_pid 2>/dev/null
     [ -n "$video_pid" ] && kill $video_pid 2>/dev/null
@@ -13,6 +14,13 @@ cleanup() {
 
 trap 'cleanup' SIGINT SIGTERM
 
+# 启动本机向量服务：模型只加载一份，向量 Worker 通过 EMBEDDING_SERVER 连接
+export EMBEDDING_SERVER="${EMBEDDING_SERVER:-unix:/tmp/bilibili_nlp_embedding.sock}"
+echo "正在启动向量编码服务 ($EMBEDDING_SERVER)..."
+python -m app.worker.main_embedding &
+embedding_pid=$!
+echo "EMBEDDING PID: $embedding_pid"
+
 # 启动后端 API 服务
 echo "正在启动后端接口 (Port: 5480)..."
 python -m uvicorn app.main:app \
@@ -40,6 +48,9 @@ echo "-----------------------------------"
 # 持续监听进程状态
 while true; do
     # 检查进程是否还在运行
+    if ! kill -0 $embedding_pid 2>/dev/null; then
+        echo "警告: 向量编码服务已意外停止。"
+    fi
     if ! kill -0 $app_pid 2>/dev/null; then
         echo "警告: 后端 API 服务已意外停止。"
     fi
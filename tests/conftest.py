@@ -0,0 +1,140 @@
+import json
+import numpy as np
+from app.database.redis_client_async import RedisClientAsync
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """
+    内存中的 redis.asyncio 客户端（decode_responses），只实现测试用到的命令
+    """
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.hashes = {}
+        self.sets = {}
+        self.lists = {}
+        self.streams = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def zpopmin(self, key, count):
+        zset = self.zsets.get(key, {})
+        oldest = sorted(zset.items(), key=lambda item: item[1])[:count]
+        for member, _ in oldest:
+            del zset[member]
+        return oldest
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(f) for f in fields]
+
+    async def hscan_iter(self, key, count=None):
+        for field, value in list(self.hashes.get(key, {}).items()):
+            yield field, value
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def sismember(self, key, member):
+        return member in self.sets.get(key, set())
+
+    async def smismember(self, key, members):
+        return [m in self.sets.get(key, set()) for m in members]
+
+    async def lpush(self, key, *values):
+        self.lists.setdefault(key, [])[:0] = reversed(values)
+
+    async def blpop(self, keys, timeout=0):
+        # 不真正阻塞：没有数据时直接按超时处理
+        for key in keys:
+            if self.lists.get(key):
+                return key, self.lists[key].pop(0)
+        return None
+
+    async def xadd(self, name, fields):
+        entries = self.streams.setdefault(name, [])
+        entries.append((f"{len(entries) + 1}-0", dict(fields)))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+def fake_async_client(redis: FakeRedis) -> RedisClientAsync:
+    """
+    包装 FakeRedis 的 RedisClientAsync，绕过单例和真实连接
+    """
+    client = object.__new__(RedisClientAsync)
+    client.redis_client = redis # type: ignore
+    return client
+
+
+class FakeRedisClient:
+    """
+    同步的 app.database.redis_client.RedisClient，值按 JSON 字符串保存
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+        return True
+
+    def redis_select(self, name):
+        value = self.data.get(name)
+        return json.loads(value) if value else None
+
+    def redis_insert(self, name, value):
+        self.data[name] = json.dumps(value)
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), 1.0, 0.5] for t in texts], dtype=np.float32)
@@ -0,0 +1,62 @@
+import asyncio
+import copy
+import json
+from app.worker.utils import comment_analyzer
+from app.worker.utils.comment_analyzer import CommentAnalyzer, IncrementalCommentStats
+from tests.conftest import FakeRedis, fake_async_client
+
+COMMENTS = [
+    {"user_name": "甲", "comment_text": "这个视频的剪辑真的很用心"},
+    {"user_name": "乙", "comment_text": "打卡打卡"},
+    {"user_name": "丙", "comment_text": "好"},
+    {"user_name": "甲", "comment_text": "剪辑和配乐都很用心 [doge]"},
+    {"user_name": "丁", "comment_text": "这个视频的剪辑真的很用心"},
+    {"user_name": "戊", "comment_text": "配乐好听，求歌名 http://example.com"},
+    {"user_name": "乙", "comment_text": "抽奖抽奖选我"},
+]
+
+
+def analyzer_with_fake_redis() -> tuple[CommentAnalyzer, FakeRedis]:
+    redis = FakeRedis()
+    analyzer = CommentAnalyzer()
+    analyzer.redis_client = fake_async_client(redis)
+    return analyzer, redis
+
+
+def test_paged_stats_match_batch_analysis():
+    analyzer, _ = analyzer_with_fake_redis()
+    cleaned, clean_stats = analyzer._preprocess_comments(copy.deepcopy(COMMENTS))
+
+    stats = IncrementalCommentStats(analyzer)
+    pages = copy.deepcopy(COMMENTS)
+    for start in range(0, len(pages), 3):
+        stats.add_page(pages[start:start + 3])
+    snapshot = stats.snapshot()
+
+    # 跨页重复的评论也按刷屏计入
+    assert snapshot["cleaning_report"] == clean_stats
+    assert snapshot["basic_stats"] == analyzer._basic_statistics(cleaned)
+    assert snapshot["keyword_analysis"] == analyzer._keyword_analysis(cleaned)
+    assert snapshot["user_activity"] == analyzer._user_activity_analysis(cleaned)
+    assert stats.pages == 3
+    assert [c["comment_text"] for c in stats.sentiment_samples] == [c["comment_text"] for c in cleaned]
+
+
+def test_stream_writes_final_result_and_clears_partial(monkeypatch):
+    analyzer, redis = analyzer_with_fake_redis()
+
+    async def sentiment(self, comments):
+        return {"negative": 0, "neutral": len(comments), "positive": 0, "examples": []}
+
+    monkeypatch.setattr(CommentAnalyzer, "_sentiment_analysis_pipeline", sentiment)
+
+    async def pages():
+        for start in range(0, len(COMMENTS), 3):
+            yield copy.deepcopy(COMMENTS[start:start + 3])
+
+    result = asyncio.run(analyzer.analyze_comment_stream(pages(), "BV1"))
+    assert result["basic_stats"]["total_comments"] == 3
+    assert result["sentiment_analysis"]["neutral"] == 3
+    assert json.loads(redis.data["comment_analysis_BV1"]) == result
+    assert "comment_analysis_partial_BV1" not in redis.data
+    assert redis.streams[comment_analyzer.RESULT_STREAM] == [("1-0", {"BV": "BV1"})]
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from app.utils.bilibili.cookie_pool import (
+    MIN_HEALTH, RECOVERY_COOLDOWN, THROTTLE_COOLDOWN, CookiePool, CookiePoolExhausted,
+    choose_cookie, cooldown_wait, recovery,
+)
+
+
+class CoolingRedis:
+    """
+    所有 cookie 都在冷却、冷却还要很久的 Redis 替身
+    """
+    def __init__(self, ttl_ms: int):
+        self.ttl_ms = ttl_ms
+
+    async def zrange(self, key, start, end, withscores=False):
+        return [("a", 100.0), ("b", 50.0)]
+
+    def pipeline(self):
+        redis = self
+
+        class Pipe:
+            def __init__(self):
+                self.count = 0
+
+            def pttl(self, key):
+                self.count += 1
+
+            async def execute(self):
+                return [redis.ttl_ms] * self.count
+
+        return Pipe()
+
+
+def test_cooling_cookies_are_skipped():
+    scores = [("a", 100), ("b", 100)]
+    assert choose_cookie(scores, [5000, -2]) == "b"
+    assert choose_cookie(scores, [5000, 3000]) is None
+
+
+def test_low_health_cookie_still_eligible_after_cooldown():
+    assert choose_cookie([("a", 1)], [-2]) == "a"
+
+
+def test_wait_for_earliest_cooldown():
+    assert cooldown_wait([5000, 1500, -2]) == 1.5
+
+
+def test_recovery_restores_health_with_long_cooldown():
+    assert recovery(MIN_HEALTH - 15, THROTTLE_COOLDOWN) == (MIN_HEALTH, max(THROTTLE_COOLDOWN, RECOVERY_COOLDOWN))
+    assert recovery(MIN_HEALTH + 5, THROTTLE_COOLDOWN) == (None, THROTTLE_COOLDOWN)
+
+
+def test_acquire_gives_up_after_timeout():
+    pool = CookiePool.__new__(CookiePool)
+    pool.kind, pool.fallback_key, pool.redis = "bilibili", "cookie", CoolingRedis(ttl_ms=600_000)
+    start = time.monotonic()
+    try:
+        asyncio.run(pool.acquire(timeout=0.1))
+    except CookiePoolExhausted:
+        assert time.monotonic() - start < 1
+        return
+    raise AssertionError("应当抛出 CookiePoolExhausted")
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from app.worker.utils.embedding_backend import (
+    ONNX_MODEL_DIR, ONNX_MODEL_FILE, OnnxBackend, SentenceTransformerBackend,
+)
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)),
+    reason="ONNX 模型未导出，先运行 python -m app.worker.utils.embedding_backend export",
+)
+
+TEXTS = [
+    "游戏 原神 教程",
+    "这个视频真的很好看，学到了很多编程知识",
+    "美食 日常 vlog",
+    "前排支持，哈哈哈笑死我了",
+]
+
+
+def test_onnx_matches_torch():
+    reference = SentenceTransformerBackend().encode(TEXTS)
+    quantized = OnnxBackend().encode(TEXTS)
+    assert quantized.shape == reference.shape == (len(TEXTS), 768)
+    cosine = np.sum(reference * quantized, axis=1)
+    assert cosine.min() > 0.98
+
+
+def test_onnx_keeps_input_order_and_single_text():
+    backend = OnnxBackend()
+    batch = backend.encode(TEXTS, batch_size=2)
+    single = backend.encode(TEXTS[1])
+    assert np.allclose(batch[1], single, atol=1e-4)
+    assert np.allclose(np.linalg.norm(batch, axis=1), 1, atol=1e-4)
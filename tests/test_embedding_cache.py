@@ -0,0 +1,31 @@
+import asyncio
+import numpy as np
+from app.worker.utils.embedding_cache import EmbeddingCache, pack_vector, unpack_vector
+from tests.conftest import CountingModel, FakeRedis
+
+
+def test_pack_roundtrip():
+    vector = np.array([0.1, -2.5, 3.0], dtype=np.float32)
+    assert np.array_equal(unpack_vector(pack_vector(vector)), vector)
+
+
+def test_repeat_texts_are_lookups():
+    model = CountingModel()
+    cache = EmbeddingCache("test-model", redis_client=FakeRedis())
+
+    first = asyncio.run(cache.encode_cached(model, ["a", "bb", "a"]))
+    assert model.encoded == ["a", "bb"]
+    assert first.shape == (3, 3)
+    assert np.array_equal(first[0], first[2])
+
+    second = asyncio.run(cache.encode_cached(model, ["bb", "ccc"]))
+    assert model.encoded == ["a", "bb", "ccc"]
+    assert np.array_equal(second[0], first[1])
+
+
+def test_cache_is_bounded():
+    redis = FakeRedis()
+    cache = EmbeddingCache("test-model", redis_client=redis, max_size=2)
+    asyncio.run(cache.encode_cached(CountingModel(), ["a", "bb", "ccc"]))
+    assert len(redis.zsets[cache.lru_key]) == 2
+    assert len(redis.data) == 2
@@ -0,0 +1,99 @@
+import asyncio
+import numpy as np
+from app.worker.main_embedding import EmbeddingServer, MicroBatcher
+from app.worker.utils.embedding_client import EmbeddingClient, EmbeddingServerError, parse_address
+from tests.conftest import CountingModel
+
+
+class BatchCountingModel(CountingModel):
+    model_id = "test-model"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return super().encode(texts, **kwargs)
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/emb.sock") == ("unix", "/tmp/emb.sock")
+    assert parse_address("tcp:127.0.0.1:5481") == ("tcp", ("127.0.0.1", 5481))
+
+
+def test_concurrent_callers_share_one_batch():
+    model = BatchCountingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch=8, max_wait=0.05)
+        runner = asyncio.create_task(batcher.run())
+        results = await asyncio.gather(batcher.encode(["a", "bb"]), batcher.encode(["ccc"]), batcher.encode(["dddd"]))
+        runner.cancel()
+        return results
+
+    first, second, third = asyncio.run(scenario())
+    assert model.calls == [["a", "bb", "ccc", "dddd"]]
+    assert first.shape == (2, 3)
+    assert second[0][0] == 3 and third[0][0] == 4
+
+
+def test_batches_are_capped():
+    model = BatchCountingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch=2, max_wait=0.05)
+        runner = asyncio.create_task(batcher.run())
+        await asyncio.gather(*(batcher.encode([t]) for t in ["a", "b", "c"]))
+        runner.cancel()
+
+    asyncio.run(scenario())
+    assert model.calls == [["a", "b"], ["c"]]
+
+
+def test_client_roundtrip_over_unix_socket(tmp_path):
+    model = BatchCountingModel()
+    address = f"unix:{tmp_path / 'emb.sock'}"
+
+    async def scenario():
+        server = EmbeddingServer(model, MicroBatcher(model, max_wait=0.02))
+        runner = asyncio.create_task(server.batcher.run())
+        listener = await server.start(address)
+        client = await EmbeddingClient(address).connect()
+        vectors = await asyncio.gather(client.encode(["a", "bb"]), client.encode(["ccc"]))
+        await client.close()
+        listener.close()
+        runner.cancel()
+        return client, vectors
+
+    client, (first, second) = asyncio.run(scenario())
+    assert client.model_id == "test-model" and client.dim == 3
+    assert np.allclose(first[:, 0], [1, 2])
+    assert np.allclose(second[:, 0], [3])
+    assert ["a", "bb", "ccc"] in model.calls
+
+
+def test_connect_gives_up_when_server_missing(tmp_path):
+    address = f"unix:{tmp_path / 'missing.sock'}"
+    try:
+        asyncio.run(EmbeddingClient(address).connect())
+    except (OSError, EmbeddingServerError):
+        return
+    raise AssertionError("应当连接失败")
+
+
+def test_oversized_request_is_split_and_reassembled():
+    model = BatchCountingModel()
+    texts = ["x" * n for n in range(1, 8)]
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch=3, max_wait=0.01)
+        runner = asyncio.create_task(batcher.run())
+        vectors = await batcher.encode(texts)
+        runner.cancel()
+        return vectors
+
+    vectors = asyncio.run(scenario())
+    assert all(len(call) <= 3 for call in model.calls)
+    assert sum(len(call) for call in model.calls) == len(texts)
+    assert np.allclose(vectors[:, 0], range(1, 8))
@@ -0,0 +1,73 @@
+import asyncio
+import numpy as np
+from app.database.local_vector_store import LocalVectorStore
+
+
+def random_vectors(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_insert_search_and_reopen(tmp_path):
+    vectors = random_vectors(3000)
+    ids = [f"BV{i}" for i in range(len(vectors))]
+    store = LocalVectorStore(str(tmp_path), dim=32)
+    asyncio.run(store.insert_vector(ids, vectors.tolist()))
+    assert asyncio.run(store.search_similar(vectors[42].tolist(), top_k=3))[0] == "BV42"
+
+    # 重复写入同一 video_id 只覆盖，不新增
+    asyncio.run(store.insert_vector(["BV42"], [vectors[7].tolist()]))
+    assert store.count == len(vectors)
+
+    reopened = LocalVectorStore(str(tmp_path))
+    assert reopened.count == len(vectors)
+    top = reopened.search_batch([vectors[7].tolist()], top_k=2)[0]
+    assert {vid for vid, _ in top} == {"BV7", "BV42"}
+
+
+def test_float16_and_ivf_recall(tmp_path):
+    vectors = random_vectors(4000, seed=1)
+    store = LocalVectorStore(str(tmp_path), dim=32, dtype="float16")
+    asyncio.run(store.insert_vector([f"BV{i}" for i in range(len(vectors))], vectors.tolist()))
+    queries = random_vectors(20, seed=2)
+    exact = store.search_batch(queries.tolist(), top_k=10)
+
+    store.build_ivf(nlist=32)
+    approx = store.search_batch(queries.tolist(), top_k=10, nprobe=8)
+    recall = np.mean([len({v for v, _ in a} & {v for v, _ in e}) / 10 for a, e in zip(approx, exact)])
+    assert recall > 0.5
+
+
+def test_exact_search_bypasses_ivf(tmp_path):
+    vectors = random_vectors(2000, seed=3)
+    store = LocalVectorStore(str(tmp_path), dim=32)
+    asyncio.run(store.insert_vector([f"BV{i}" for i in range(len(vectors))], vectors.tolist()))
+    queries = random_vectors(10, seed=4).tolist()
+    before = store.search_batch(queries, top_k=5)
+
+    store.build_ivf(nlist=64)
+    assert store.search_batch(queries, top_k=5, exact=True) == before
+    assert store.search_batch(queries, top_k=5, nprobe=0) == before
+    assert not [name for name in tmp_path.iterdir() if name.suffix == ".tmp"]
+
+
+def test_ids_are_appended_and_recovered(tmp_path):
+    import json
+    vectors = random_vectors(3, seed=5)
+    store = LocalVectorStore(str(tmp_path), dim=32)
+    asyncio.run(store.insert_vector(["BV0", "BV1"], vectors[:2].tolist()))
+    asyncio.run(store.insert_vector(["BV1", "BV2"], vectors[1:].tolist()))
+    assert (tmp_path / "ids.jsonl").read_text(encoding="utf-8").splitlines() == ['"BV0"', '"BV1"', '"BV2"']
+
+    # 模拟追加 ids 后、写 meta 前进程退出：多出的行在重新打开时被丢弃
+    with open(tmp_path / "ids.jsonl", "a", encoding="utf-8") as f:
+        f.write('"BV3"\n"BV')
+    reopened = LocalVectorStore(str(tmp_path))
+    assert reopened.ids == ["BV0", "BV1", "BV2"]
+    asyncio.run(reopened.insert_vector(["BV9"], vectors[:1].tolist()))
+    assert LocalVectorStore(str(tmp_path)).ids == ["BV0", "BV1", "BV2", "BV9"]
+
+    # 旧版的 ids.json 在打开时转换为逐行格式
+    (tmp_path / "ids.jsonl").unlink()
+    (tmp_path / "ids.json").write_text(json.dumps(["BV0", "BV1", "BV2", "BV9"]), encoding="utf-8")
+    assert LocalVectorStore(str(tmp_path)).ids == ["BV0", "BV1", "BV2", "BV9"]
+    assert not (tmp_path / "ids.json").exists()
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from app.database.local_vector_store import LocalVectorStore
+from app.worker import main_vector
+from app.worker.utils.embedding_cache import EmbeddingCache
+from tests.conftest import CountingModel, FakeRedis, fake_async_client
+
+
+def test_reply_goes_to_request_key_or_legacy_stream(monkeypatch):
+    redis = FakeRedis()
+
+    async def get_tuijian_bvs(user_id, redis, milvus):
+        return [f"BV_for_{user_id}"]
+
+    monkeypatch.setattr(main_vector, "get_tuijian_bvs", get_tuijian_bvs)
+    client = fake_async_client(redis)
+    asyncio.run(main_vector.handle_tuijian_request({"user_id": "1", "reply_key": "tuijian_reply:abc"}, client, None)) # type: ignore
+    asyncio.run(main_vector.handle_tuijian_request({"user_id": "2"}, client, None)) # type: ignore
+
+    assert redis.lists["tuijian_reply:abc"] == [json.dumps(["BV_for_1"])]
+    assert redis.streams[main_vector.VECTOR_TUIJIAN_RESULT] == [
+        ("1-0", {"user_id": "2", "data": json.dumps(["BV_for_2"])}),
+    ]
+
+
+def test_failed_recommendation_still_replies(monkeypatch):
+    redis = FakeRedis()
+
+    async def get_tuijian_bvs(user_id, redis, milvus):
+        raise RuntimeError("milvus down")
+
+    monkeypatch.setattr(main_vector, "get_tuijian_bvs", get_tuijian_bvs)
+    asyncio.run(main_vector.handle_tuijian_request({"user_id": "1", "reply_key": "k"}, fake_async_client(redis), None)) # type: ignore
+    assert redis.lists["k"] == ["null"]
+
+
+def test_indexing_is_idempotent(monkeypatch, tmp_path):
+    redis = FakeRedis()
+    client = fake_async_client(redis)
+    model = CountingModel()
+    store = LocalVectorStore(str(tmp_path), dim=3)
+    monkeypatch.setattr(main_vector, "model", model)
+    monkeypatch.setattr(main_vector, "embedding_cache", EmbeddingCache("test-model", redis_client=redis))
+    monkeypatch.setattr(main_vector, "tag_index", main_vector.TagIndex())
+
+    asyncio.run(main_vector.encode_and_insert({"BV1": ["原神"], "BV2": ["美食"]}, client, store)) # type: ignore
+    assert asyncio.run(main_vector.filter_unindexed(["BV1", "BV2", "BV3"], client)) == ["BV3"]
+    assert asyncio.run(main_vector.filter_unindexed(["BV1", "BV3"], client, forced={"BV1"})) == ["BV1", "BV3"]
+
+    # 强制重建时 upsert 覆盖原有行，不会新增
+    asyncio.run(main_vector.encode_and_insert({"BV1": ["游戏"]}, client, store)) # type: ignore
+    assert store.count == 2
+    assert json.loads(redis.hashes[main_vector.VIDEO_TAGS_KEY]["BV1"]) == ["游戏"]
@@ -0,0 +1,91 @@
+import asyncio
+import time
+import httpx
+from app.utils.bilibili.rate_limiter import TokenBucket, RateLimiter, limited_get, MIN_RATE, INCREASE_STEP, BACKOFF_BASE
+
+
+def test_throttle_halves_rate_and_blocks():
+    bucket = TokenBucket(rate=4)
+    bucket.on_throttle()
+    assert bucket.rate == 2
+    assert bucket.ceiling == 4
+    assert bucket.blocked_until > time.monotonic()
+
+    for _ in range(20):
+        bucket.on_throttle()
+    assert bucket.rate == MIN_RATE
+
+
+def test_success_grows_slower_near_ceiling():
+    bucket = TokenBucket(rate=1)
+    bucket.on_success()
+    assert abs(bucket.rate - (1 + INCREASE_STEP)) < 1e-9
+
+    bucket.ceiling = bucket.rate
+    before = bucket.rate
+    bucket.on_success()
+    assert abs(bucket.rate - before - INCREASE_STEP / 10) < 1e-9
+
+
+def test_bucket_per_cookie_and_endpoint():
+    limiter = RateLimiter()
+    a = limiter.get_bucket("SESSDATA=a", "reply")
+    assert limiter.get_bucket("SESSDATA=a", "reply") is a
+    assert limiter.get_bucket("SESSDATA=b", "reply") is not a
+    assert limiter.get_bucket("SESSDATA=a", "view") is not a
+
+
+def test_acquire_respects_rate():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert elapsed >= 4 / 20 * 0.9
+
+
+def test_concurrent_throttles_cut_rate_once():
+    class ThrottledClient:
+        async def get(self, url, headers=None, **kwargs):
+            await asyncio.sleep(0.01)
+            return httpx.Response(412, request=httpx.Request("GET", url))
+
+    async def run():
+        bucket = RateLimiter().get_bucket("SESSDATA=burst", "reply")
+        bucket.rate, bucket.capacity, bucket.tokens = 8, 8, 8
+        await asyncio.gather(*(limited_get(ThrottledClient(), "reply", "http://test", {"Cookie": "SESSDATA=burst"},
+                                           retries=0) for _ in range(8)))
+        return bucket
+
+    bucket = asyncio.run(run())
+    assert bucket.rate == 4
+    assert bucket.backoff == BACKOFF_BASE * 2
+
+
+def test_throttled_request_is_retried_after_backoff():
+    class FlakyClient:
+        def __init__(self, failures):
+            self.failures, self.calls = failures, 0
+
+        async def get(self, url, headers=None, **kwargs):
+            self.calls += 1
+            status = 412 if self.calls <= self.failures else 200
+            return httpx.Response(status, request=httpx.Request("GET", url))
+
+    async def run(client, cookie):
+        bucket = RateLimiter().get_bucket(cookie, "reply")
+        bucket.rate = bucket.capacity = bucket.tokens = 50
+        bucket.backoff = 0.01
+        return await limited_get(client, "reply", "http://test", {"Cookie": cookie}, retries=2)
+
+    recovered = FlakyClient(failures=1)
+    assert asyncio.run(run(recovered, "SESSDATA=retry")).status_code == 200
+    assert recovered.calls == 2
+
+    # 重试次数用尽后返回最后一次的限流响应
+    exhausted = FlakyClient(failures=10)
+    assert asyncio.run(run(exhausted, "SESSDATA=giveup")).status_code == 412
+    assert exhausted.calls == 3
@@ -0,0 +1,50 @@
+import json
+from app.utils.bilibili.reply_decoder import decode_cursor, decode_replies
+
+PAYLOAD = {
+    "code": 0,
+    "message": "0",
+    "data": {
+        "cursor": {"is_end": False, "next": 2},
+        "replies": [
+            {
+                "rpid": 101, "ctime": 1700000000, "parent": 0, "root": 0, "like": 12, "rcount": 2,
+                "member": {"uname": "up", "mid": "1", "avatar": "x"},
+                "content": {"message": "主评论", "emote": {}},
+                "replies": [
+                    {
+                        "rpid": 102, "ctime": 1700000100, "parent": 101, "root": 101, "like": 1,
+                        "member": {"uname": "fan"}, "content": {"message": "子回复"}, "replies": None,
+                    }
+                ],
+            },
+            {
+                "rpid": 103, "ctime": 1700000200, "parent": 0, "root": 0, "like": 0, "rcount": 0,
+                "member": {"uname": "other"}, "content": {"message": "第二条"}, "replies": None,
+            },
+        ],
+    },
+}
+
+
+def test_decode_replies_keeps_only_needed_fields():
+    comments = decode_replies([], json.dumps(PAYLOAD).encode("utf-8"))
+    assert comments == [
+        {'user_name': 'up', 'comment_text': '主评论', 'bert_label': 12, 'rpid': 101,
+         'ctime': 1700000000, 'parent': 0, 'root': 0, 'rcount': 2},
+        {'user_name': 'fan', 'comment_text': '子回复', 'bert_label': '待分析', 'rpid': 102,
+         'ctime': 1700000100, 'parent': 101, 'root': 101},
+        {'user_name': 'other', 'comment_text': '第二条', 'bert_label': 0, 'rpid': 103,
+         'ctime': 1700000200, 'parent': 0, 'root': 0, 'rcount': 0},
+    ]
+
+
+def test_decode_replies_accepts_str_and_error_codes():
+    assert decode_replies([], json.dumps(PAYLOAD, ensure_ascii=False)) == decode_replies([], json.dumps(PAYLOAD))
+    assert decode_replies([], '{"code": -412, "message": "请求被拦截", "data": null}') == []
+    assert decode_replies([], '{"code": 0, "data": {"replies": null}}') == []
+
+
+def test_decode_cursor():
+    assert decode_cursor(json.dumps(PAYLOAD)) == (2, False)
+    assert decode_cursor(json.dumps({"code": 0, "data": {"replies": []}})) == (0, True)
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from app.utils.bilibili.response_cache import ENDPOINT_TTLS, ResponseCache
+
+
+def open_cache(tmp_path, monkeypatch) -> ResponseCache:
+    # ResponseCache 是进程内单例，每个测试使用自己的临时文件
+    monkeypatch.setattr(ResponseCache, "_instance", None)
+    return ResponseCache(str(tmp_path / "responses.sqlite3"))
+
+
+def age_entry(cache: ResponseCache, endpoint: str, key: str, seconds: float) -> None:
+    cache.conn.execute("UPDATE response_cache SET stored_at = ? WHERE endpoint = ? AND key = ?",
+                       (time.time() - seconds, endpoint, key))
+
+
+class Fetcher:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_fresh_entry_skips_fetch(tmp_path, monkeypatch):
+    cache = open_cache(tmp_path, monkeypatch)
+    first, second = Fetcher({"title": "旧"}), Fetcher({"title": "新"})
+    assert asyncio.run(cache.get_or_fetch("view", "BV1", first)) == {"title": "旧"}
+    assert asyncio.run(cache.get_or_fetch("view", "BV1", second)) == {"title": "旧"}
+    assert (first.calls, second.calls) == (1, 0)
+
+
+def test_stale_entry_is_served_then_refreshed(tmp_path, monkeypatch):
+    cache = open_cache(tmp_path, monkeypatch)
+    ttl, swr = ENDPOINT_TTLS["view"]
+    cache.set("view", "BV1", {"title": "旧"})
+    age_entry(cache, "view", "BV1", ttl + swr / 2)
+    fetcher = Fetcher({"title": "新"})
+
+    async def run():
+        value = await cache.get_or_fetch("view", "BV1", fetcher)
+        await asyncio.gather(*cache._tasks)
+        return value
+
+    assert asyncio.run(run()) == {"title": "旧"}
+    assert fetcher.calls == 1
+    assert cache.get("view", "BV1")[0] == {"title": "新"} # type: ignore
+
+
+def test_expired_entry_is_fetched_and_failures_are_not_cached(tmp_path, monkeypatch):
+    cache = open_cache(tmp_path, monkeypatch)
+    ttl, swr = ENDPOINT_TTLS["view"]
+    cache.set("view", "BV1", {"title": "旧"})
+    age_entry(cache, "view", "BV1", ttl + swr + 1)
+
+    assert asyncio.run(cache.get_or_fetch("view", "BV1", Fetcher(None))) is None
+    assert cache.get("view", "BV1")[0] == {"title": "旧"} # type: ignore
+    assert asyncio.run(cache.get_or_fetch("view", "BV1", Fetcher({"title": "新"}))) == {"title": "新"}
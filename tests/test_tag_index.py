@@ -0,0 +1,74 @@
+import asyncio
+from app.worker.utils.tag_index import TagIndex, count_terms, query_terms_from_counts, rrf_fuse
+from tests.conftest import FakeRedis
+
+
+class CountingScans(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.scans = 0
+
+    async def hscan_iter(self, key, count=None):
+        self.scans += 1
+        async for item in super().hscan_iter(key, count):
+            yield item
+
+
+def build_index() -> TagIndex:
+    index = TagIndex()
+    index.add("BV_game", ["原神", "游戏", "攻略"])
+    index.add("BV_code", ["编程", "Python", "教程"])
+    index.add("BV_food", ["美食", "日常"])
+    index.add("BV_mix", ["游戏", "编程", "教程", "日常", "知识"])
+    return index
+
+
+def test_bm25_ranks_matching_tags_first():
+    index = build_index()
+    hits = index.search(["python", "编程"], top_k=3)
+    assert [vid for vid, _ in hits][:2] == ["BV_code", "BV_mix"]
+    assert index.search(["不存在的词"]) == []
+
+
+def test_replacing_tags_updates_postings():
+    index = build_index()
+    index.add("BV_food", ["原神"])
+    assert len(index) == 4
+    assert "BV_food" in [vid for vid, _ in index.search(["原神"])]
+    assert index.search(["美食"]) == []
+
+
+def test_query_terms_weight_frequent_words():
+    terms = query_terms_from_counts(count_terms(["原神真好玩", "原神新版本", "今天吃美食"]))
+    assert terms["原神"] > terms["美食"]
+
+
+def test_rrf_prefers_items_in_both_lists():
+    dense = ["a", "b", "c"]
+    sparse = ["c", "d", "a"]
+    fused = rrf_fuse([dense, sparse], top_k=4)
+    assert fused[:2] == ["a", "c"]
+    assert set(fused) == {"a", "b", "c", "d"}
+    assert rrf_fuse([["x"], []], top_k=3) == ["x"]
+
+
+def test_refresh_reloads_only_when_another_process_writes():
+    redis = CountingScans()
+    redis.hashes["video_tags"] = {"BV_bad": "不是 JSON"}
+    worker, other = TagIndex(), TagIndex()
+    asyncio.run(worker.load(redis))
+    asyncio.run(other.load(redis))
+    assert redis.scans == 2
+
+    # 无法解析的标签不会让每次 refresh 都重新加载
+    asyncio.run(worker.refresh(redis))
+    asyncio.run(worker.save({"BV_game": ["原神"]}, redis))
+    asyncio.run(worker.refresh(redis))
+    assert redis.scans == 2
+
+    # 替换已有视频的标签时哈希长度不变，也能被其他进程发现
+    asyncio.run(other.refresh(redis))
+    asyncio.run(worker.save({"BV_game": ["美食"]}, redis))
+    asyncio.run(other.refresh(redis))
+    assert redis.scans == 4
+    assert [vid for vid, _ in other.search(["美食"])] == ["BV_game"]
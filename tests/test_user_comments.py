@@ -0,0 +1,27 @@
+import asyncio
+import httpx
+from app.utils.bilibili import get_user_comments
+
+
+class FixedPool:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def fetch(self, client, endpoint, url, make_headers):
+        return httpx.Response(200, content=self.body, request=httpx.Request("GET", url))
+
+
+def fetch_page(body: bytes, monkeypatch):
+    monkeypatch.setattr(get_user_comments, "cookie_pool_async", FixedPool(body))
+    return asyncio.run(get_user_comments.fetch_user_comment_page(None, 1, 1, asyncio.Semaphore(1))) # type: ignore
+
+
+def test_malformed_pages_are_treated_as_failures(monkeypatch):
+    assert fetch_page(b"<html>502 Bad Gateway</html>", monkeypatch) is None
+    assert fetch_page(b'["not", "a", "dict"]', monkeypatch) is None
+    assert fetch_page(b'{"code": 0, "data": null}', monkeypatch) is None
+
+
+def test_valid_page_returns_data(monkeypatch):
+    data = fetch_page('{"code": 0, "data": {"replies": [{"message": "你好"}]}}'.encode("utf-8"), monkeypatch)
+    assert get_user_comments.parse_user_replies(data) == [{"comment_text": "你好"}]
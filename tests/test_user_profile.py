@@ -0,0 +1,105 @@
+import asyncio
+import numpy as np
+from app.worker.utils.user_profile import UserProfileStore, decayed_mean_update
+from tests.conftest import CountingModel, FakeRedis
+
+
+def test_mean_without_decay_is_running_average():
+    mean, weight = decayed_mean_update(None, 0, 0, np.array([[1.0, 0.0]]), now=0, half_life=0)
+    mean, weight = decayed_mean_update(mean, weight, 0, np.array([[0.0, 1.0], [0.0, 1.0]]), now=100, half_life=0)
+    assert weight == 3
+    assert np.allclose(mean, [1 / 3, 2 / 3])
+
+
+def test_decay_halves_old_weight_after_half_life():
+    mean, weight = decayed_mean_update(np.array([1.0, 0.0]), 2, 0, np.array([[0.0, 1.0]]), now=10, half_life=10)
+    assert weight == 2
+    assert np.allclose(mean, [0.5, 0.5])
+
+
+def test_only_new_comments_are_encoded():
+    model = CountingModel()
+    store = UserProfileStore("test-model", redis_client=FakeRedis())
+
+    first = asyncio.run(store.update_many({"42": ["a", "bb"]}, model))["42"]["mean"]
+    assert model.encoded == ["a", "bb"]
+    assert np.allclose(first, [1.5, 1.0, 0.5])
+
+    second = asyncio.run(store.update_many({"42": ["a", "bb", "cccc"]}, model))["42"]["mean"]
+    assert model.encoded == ["a", "bb", "cccc"]
+    assert second[0] > first[0]
+    assert np.allclose(asyncio.run(store.load("42"))["mean"], second)
+
+    assert asyncio.run(store.update_many({"42": ["a"]}, model))["42"]["mean"] is not None
+    assert model.encoded == ["a", "bb", "cccc"]
+
+
+def test_online_kmeans_separates_distinct_interests():
+    from app.worker.utils.user_profile import online_kmeans_update
+    games = np.array([[1.0, 0.05, 0.0], [0.95, 0.0, 0.05]])
+    food = np.array([[0.0, 1.0, 0.05], [0.05, 0.95, 0.0]])
+    centroids, counts = online_kmeans_update(None, None, np.vstack([games, food]), k=3, threshold=0.75)
+    assert len(centroids) == 2
+    assert counts.tolist() == [2, 2]
+
+    centroids, counts = online_kmeans_update(centroids, counts, games, decay=0.5, k=3, threshold=0.75)
+    assert counts.tolist() == [3, 1]
+
+
+def test_merge_with_quotas_dedupes_and_fills():
+    from app.worker.utils.user_profile import merge_with_quotas
+    results = [["a", "b", "c", "d"], ["b", "x", "y"]]
+    assert merge_with_quotas(results, [3, 1], 4) == ["a", "b", "c", "d"]
+    assert merge_with_quotas(results, [1, 1], 4) == ["a", "b", "c", "x"]
+    assert merge_with_quotas([["a"], ["a", "b"]], [1, 1], 5) == ["a", "b"]
+
+
+def test_update_many_encodes_all_users_once():
+    model = CountingModel()
+    redis = FakeRedis()
+    store = UserProfileStore("test-model", redis_client=redis)
+    asyncio.run(store.update_many({"1": ["a"]}, model))
+
+    profiles = asyncio.run(store.update_many({"1": ["a", "bb"], "2": ["ccc"], "3": []}, model))
+    assert model.encoded == ["a", "bb", "ccc"]
+    assert profiles["3"]["mean"] is None
+    stored = asyncio.run(store.load_many(["1", "2"]))
+    assert np.allclose(profiles["2"]["mean"], stored["2"]["mean"])
+    assert np.allclose(profiles["1"]["mean"], stored["1"]["mean"])
+
+
+def test_update_many_encodes_in_slices_and_isolates_failures():
+    class FailingModel(CountingModel):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def encode(self, texts, **kwargs):
+            self.calls += 1
+            if any(t.startswith("bad") for t in texts):
+                raise RuntimeError("encode failed")
+            return super().encode(texts, **kwargs)
+
+    model = FailingModel()
+    store = UserProfileStore("test-model", redis_client=FakeRedis())
+    profiles = asyncio.run(store.update_many({"1": ["a", "bb"], "2": ["bad"], "3": ["ccc"]}, model, slice_size=2))
+    assert model.calls == 2
+    assert profiles["1"]["mean"] is not None
+    assert profiles["2"]["mean"] is None
+    # "ccc" 与失败的 "bad" 在同一片中，该用户这次不更新
+    assert profiles["3"]["mean"] is None
+
+    profiles = asyncio.run(store.update_many({"3": ["ccc"]}, model, slice_size=2))
+    assert profiles["3"]["mean"] is not None
+
+
+def test_profile_keeps_comment_terms_for_retrieval():
+    model = CountingModel()
+    store = UserProfileStore("test-model", redis_client=FakeRedis())
+    asyncio.run(store.update_many({"1": ["原神 原神 启动"]}, model))
+    asyncio.run(store.update_many({"1": ["原神 好玩"]}, model))
+
+    profiles = asyncio.run(store.load_many(["1", "2"]))
+    assert profiles["1"]["terms"]["原神"] == 3
+    assert profiles["1"]["terms"]["好玩"] == 1
+    assert profiles["2"]["mean"] is None and profiles["2"]["terms"] == {}
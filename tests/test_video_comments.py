@@ -0,0 +1,132 @@
+import asyncio
+import json
+from app.utils.bilibili import get_video_comments as vc
+from tests.conftest import FakeRedisClient
+
+
+def comment(rpid: int, ctime: int | None = None, **fields) -> dict:
+    return {"rpid": rpid, "ctime": ctime if ctime is not None else rpid, "parent": 0,
+            "comment_text": f"评论{rpid}", **fields}
+
+
+def use_redis(monkeypatch) -> FakeRedisClient:
+    redis = FakeRedisClient()
+    monkeypatch.setattr(vc, "redis_client", redis)
+    monkeypatch.setattr(vc, "get_http_client", lambda: None)
+    return redis
+
+
+def use_time_pages(monkeypatch, pages: dict[int, tuple[list[dict], int, bool] | None]) -> list[int]:
+    """
+    按时间排序翻页的假接口：cursor -> (评论, next, is_end)，None 表示请求失败；返回请求过的 cursor
+    """
+    requested = []
+
+    async def fetch_page_with_cursor(client, BV, cursor, semaphore, mode=vc.MODE_TIME):
+        requested.append(cursor)
+        return pages[cursor]
+
+    monkeypatch.setattr(vc, "fetch_page_with_cursor", fetch_page_with_cursor)
+    return requested
+
+
+def test_merge_comments_puts_new_first_and_dedupes():
+    stored = [comment(2), comment(1)]
+    merged = vc.merge_comments([comment(4), comment(3), comment(2), comment(4)], stored)
+    assert [c["rpid"] for c in merged] == [4, 3, 2, 1]
+
+
+def test_get_new_comments_follows_cursor_until_checkpoint(monkeypatch):
+    use_redis(monkeypatch)
+    requested = use_time_pages(monkeypatch, {
+        0: ([comment(9), comment(8)], 17, False),
+        17: ([comment(7), comment(5), comment(4)], 23, False),
+    })
+    new, cursor = asyncio.run(vc.get_new_comments("BV1", {"newest_rpid": 5, "newest_ctime": 5}))
+    assert requested == [0, 17]
+    assert [c["rpid"] for c in new] == [9, 8, 7]
+    assert cursor == 0
+
+
+def test_get_new_comments_stops_on_is_end_and_failure(monkeypatch):
+    use_redis(monkeypatch)
+    use_time_pages(monkeypatch, {0: ([comment(9)], 0, True)})
+    assert asyncio.run(vc.get_new_comments("BV1", {"newest_rpid": 5, "newest_ctime": 5})) == ([comment(9)], 0)
+
+    use_time_pages(monkeypatch, {0: ([comment(9)], 17, False), 17: None})
+    assert asyncio.run(vc.get_new_comments("BV1", {"newest_rpid": 5, "newest_ctime": 5})) is None
+
+
+def test_sync_resumes_from_saved_cursor(monkeypatch):
+    redis = use_redis(monkeypatch)
+    monkeypatch.setattr(vc, "SYNC_MAX_PAGES", 1)
+    redis.redis_insert("BV1", [comment(5)])
+    vc.save_checkpoint("BV1", [comment(5)])
+    use_time_pages(monkeypatch, {
+        0: ([comment(9), comment(8)], 17, False),
+        17: ([comment(7), comment(5)], 23, False),
+    })
+
+    # 第一次没有追上检查点：newest_* 不前进，记录续翻的 cursor
+    assert [c["rpid"] for c in asyncio.run(vc.sync_comments("BV1"))] == [9, 8, 5]
+    checkpoint = vc.get_checkpoint("BV1")
+    assert (checkpoint["newest_rpid"], checkpoint["cursor"]) == (5, 17) # type: ignore
+
+    # 第二次从 cursor 17 继续，追上后 newest_* 前进到合并后的最新评论
+    assert [c["rpid"] for c in asyncio.run(vc.sync_comments("BV1"))] == [7, 9, 8, 5]
+    checkpoint = vc.get_checkpoint("BV1")
+    assert (checkpoint["newest_rpid"], checkpoint["cursor"]) == (9, 0) # type: ignore
+
+
+def test_failed_sync_keeps_checkpoint(monkeypatch):
+    redis = use_redis(monkeypatch)
+    redis.redis_insert("BV1", [comment(5)])
+    redis.set("comment_cursor:BV1", {"newest_rpid": 5, "newest_ctime": 5, "cursor": 0, "synced_at": 1})
+    use_time_pages(monkeypatch, {0: None})
+
+    assert asyncio.run(vc.sync_comments("BV1")) == [comment(5)]
+    assert vc.get_checkpoint("BV1")["synced_at"] == 1 # type: ignore
+    assert not vc.is_cache_fresh("BV1")
+
+
+def test_incomplete_full_crawl_is_not_cached(monkeypatch):
+    redis = use_redis(monkeypatch)
+    results = iter([([comment(1)], False), ([comment(1), comment(2)], True)])
+
+    async def crawl_comments(BV, page_many, expand_replies=False):
+        return next(results)
+
+    monkeypatch.setattr(vc, "crawl_comments", crawl_comments)
+    assert asyncio.run(vc.sync_comments("BV1")) == [comment(1)]
+    assert redis.redis_select("BV1") is None and vc.get_checkpoint("BV1") is None
+
+    asyncio.run(vc.sync_comments("BV1"))
+    assert redis.redis_select("BV1") == [comment(1), comment(2)]
+    assert vc.get_checkpoint("BV1")["newest_rpid"] == 2 # type: ignore
+
+
+def test_expand_sub_replies_pages_and_dedupes(monkeypatch):
+    monkeypatch.setattr(vc, "SUB_REPLY_MAX_PAGES", 2)
+    requested = []
+
+    async def fetch_reply_url(client, BV, url, semaphore):
+        requested.append(url)
+        root = int(url.split("root=")[1].split("&")[0])
+        return [comment(root * 10 + 1, root=root), comment(root * 10 + 2, root=root)]
+
+    monkeypatch.setattr(vc, "fetch_reply_url", fetch_reply_url)
+    comments = [
+        comment(1, rcount=1), comment(11, root=1),  # 内嵌回复已经齐全，不展开
+        comment(2, rcount=100),                     # 超过上限，只展开 SUB_REPLY_MAX_PAGES 页
+        comment(3, rcount=2),
+    ]
+    expanded = asyncio.run(vc.expand_sub_replies(None, "BV1", comments, asyncio.Semaphore(2))) # type: ignore
+    assert len(requested) == 3
+    assert sorted(c["rpid"] for c in expanded) == [21, 22, 31, 32]
+
+
+def test_checkpoint_is_stored_as_json(monkeypatch):
+    redis = use_redis(monkeypatch)
+    vc.save_checkpoint("BV1", [comment(3), comment(7, ctime=1)])
+    stored = json.loads(redis.get("comment_cursor:BV1"))
+    assert (stored["newest_rpid"], stored["newest_ctime"], stored["cursor"]) == (7, 3, 0)
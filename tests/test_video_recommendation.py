@@ -0,0 +1,76 @@
+import asyncio
+import json
+import pytest
+from app.utils.bilibili import video_recommendation
+from app.utils.bilibili.cookie_pool import CookiePoolExhausted
+from tests.conftest import FakeRedis, fake_async_client
+
+
+class NoCache:
+    async def get_or_fetch(self, endpoint, key, fetcher):
+        return await fetcher()
+
+
+def get_infos(fetch, monkeypatch):
+    monkeypatch.setattr(video_recommendation, "response_cache", NoCache())
+    monkeypatch.setattr(video_recommendation, "fetch_video_info", fetch)
+    return asyncio.run(video_recommendation.get_video_infos(["BV_ok", "BV_error", "BV_none"]))
+
+
+def test_failed_videos_do_not_affect_the_batch(monkeypatch):
+    async def fetch(BVid):
+        if BVid == "BV_error":
+            raise ValueError("bad json")
+        return {"msg": "OK"} if BVid == "BV_ok" else None
+
+    assert get_infos(fetch, monkeypatch) == {
+        "BV_ok": {"msg": "OK"}, "BV_error": {"msg": "fail"}, "BV_none": {"msg": "fail"},
+    }
+
+
+def test_exhausted_cookie_pool_is_raised(monkeypatch):
+    async def fetch(BVid):
+        raise CookiePoolExhausted("cookie 池没有可用账号")
+
+    with pytest.raises(CookiePoolExhausted):
+        get_infos(fetch, monkeypatch)
+
+
+class AnsweringRedis(FakeRedis):
+    """
+    收到推荐请求时立即按 reply_key 应答，模拟向量 Worker
+    """
+    async def xadd(self, name, fields):
+        await super().xadd(name, fields)
+        if name == video_recommendation.VECTOR_TUIJIAN:
+            await self.lpush(fields["reply_key"], json.dumps([f"BV_for_{fields['user_id']}"]))
+
+
+def test_concurrent_recommendations_get_their_own_replies(monkeypatch):
+    monkeypatch.setattr(video_recommendation, "redis", fake_async_client(AnsweringRedis()))
+
+    async def run():
+        return await asyncio.gather(*(video_recommendation.get_tuijian_bvs(uid) for uid in ["1", "2", "3"]))
+
+    assert asyncio.run(run()) == [["BV_for_1"], ["BV_for_2"], ["BV_for_3"]]
+
+
+def test_recommendation_timeout_returns_none(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(video_recommendation, "redis", fake_async_client(redis))
+    assert asyncio.run(video_recommendation.get_tuijian_bvs("1", timeout=1)) is None
+    request = redis.streams[video_recommendation.VECTOR_TUIJIAN][0][1]
+    assert request["reply_key"] == video_recommendation.tuijian_reply_key(request["request_id"])
+
+
+def test_indexed_bvs_are_not_resubmitted_unless_forced(monkeypatch):
+    redis = FakeRedis()
+    redis.sets[video_recommendation.INDEXED_BVS] = {"BV_done"}
+    monkeypatch.setattr(video_recommendation, "redis", fake_async_client(redis))
+
+    assert asyncio.run(video_recommendation.insert_vector_by_BV("BV_done")) is False
+    assert asyncio.run(video_recommendation.insert_vector_by_BV("BV_new")) is True
+    assert asyncio.run(video_recommendation.insert_vector_by_BV("BV_done", force=True)) is True
+    assert [fields for _, fields in redis.streams[video_recommendation.VECTOR_INSRET]] == [
+        {"BV": "BV_new"}, {"BV": "BV_done", "force": "1"},
+    ]